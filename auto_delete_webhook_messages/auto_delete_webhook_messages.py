@@ -1,32 +1,448 @@
 """
 Automatically delete the annoying [modmail] None on development, etc. messages in #github.
+
+The rules are read from the JSON file at `AUTO_DELETE_RULES_PATH` (defaults to `rules.json`
+next to this plugin) and reloaded when the file changes, without it `DEFAULT_RULES` apply:
+
+    [
+        {
+            "name": "ci-success",
+            "channel_id": 515072282906066945,
+            "webhook_id": 515468206224441364,
+            "title": ["^\\[modmail\\] None on"],
+            "description": [],
+            "action": "delete"
+        }
+    ]
+
+A rule matches when any of its `title` or `description` patterns matches the first embed.
+
+`delete` is the only supported action. `{prefix}webhookrules` lists the rules and how many messages
+each matched since the plugin was loaded.
+
+Messages posted while the bot was offline are swept on startup, or with `{prefix}sweepwebhooks`.
+The last processed message of every channel is stored in `AUTO_DELETE_STATE_PATH`.
+
+With `AUTO_DELETE_RAW_GATEWAY=1` messages are matched on the raw gateway payload instead, matching
+messages are deleted by ID and never built, cached or dispatched to `on_message` listeners.
 """
 from __future__ import annotations
-from typing import TYPE_CHECKING
+
+import asyncio
+import json
+import os
+import re
+import time
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Pattern, Set, Tuple
+
+import discord
+from discord.ext import commands
+
+from core import checks
+from core.models import PermissionLevel, getLogger
 
 if TYPE_CHECKING:
-    import discord
     from discord.ext.commands import Bot
 
+logger = getLogger(__name__)
 
 CHANNEL_ID = 515072282906066945
 WEBHOOK_ID = 515468206224441364
 
+DEFAULT_RULES = [
+    {
+        "name": "none-on",
+        "channel_id": CHANNEL_ID,
+        "webhook_id": WEBHOOK_ID,
+        "title": [r"^\[modmail\] None on"],
+        "action": "delete",
+    },
+    {
+        "name": "checks-success",
+        "channel_id": CHANNEL_ID,
+        "webhook_id": WEBHOOK_ID,
+        "title": [
+            r"\[modmail\] (?:Python|GitHub Actions checks).*success on",
+            r"success on.*\[modmail\] (?:Python|GitHub Actions checks)",
+        ],
+        "action": "delete",
+    },
+]
+
+RULES_PATH = os.getenv(
+    "AUTO_DELETE_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json")
+)
+# Seconds between checks whether the rules file changed
+RELOAD_INTERVAL = 10
+
+STATE_PATH = os.getenv(
+    "AUTO_DELETE_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sweep_state.json")
+)
+# Messages scanned in a channel that has never been swept
+INITIAL_SWEEP_LIMIT = 500
+# Bulk deletes only accept messages younger than 14 days, keep a margin for the request itself
+BULK_DELETE_MAX_AGE = timedelta(days=14, minutes=-5)
+
+ACTIONS = ("delete",)
+
+RAW_GATEWAY = os.getenv("AUTO_DELETE_RAW_GATEWAY", "0").lower() in ("1", "true", "yes")
+
+
+class Rule:
+    __slots__ = ("name", "action", "hits")
+
+    def __init__(self, name: str, action: str):
+        self.name = name
+        self.action = action
+        self.hits = 0
+
+
+class RuleBucket:
+    """The rules of one channel and webhook, their patterns combined into one regex per field."""
+
+    __slots__ = ("rules", "title", "description")
+
+    def __init__(self):
+        self.rules: Dict[str, Rule] = {}
+        self.title: Optional[Pattern] = None
+        self.description: Optional[Pattern] = None
+
+    def match(self, title: Optional[str], description: Optional[str]) -> Optional[Rule]:
+        for pattern, text in ((self.title, title), (self.description, description)):
+            if pattern is not None and text:
+                match = pattern.search(text)
+                if match is not None:
+                    return self.rules[match.lastgroup]
+        return None
+
+
+class RuleEngine:
+    """Rules compiled into buckets keyed by `(channel_id, webhook_id)`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.buckets: Dict[Tuple[int, int], RuleBucket] = {}
+        self.rules: List[Rule] = []
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.load()
+
+    def load(self) -> None:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        if self.buckets and mtime == self._mtime:
+            return
+
+        try:
+            if mtime is None:
+                config = DEFAULT_RULES
+            else:
+                with open(self.path, encoding="utf-8") as f:
+                    config = json.load(f)
+            buckets, rules = self.compile(config)
+            # Keep the hit counts of the rules that survive a reload
+            hits = {rule.name: rule.hits for rule in self.rules}
+            for rule in rules:
+                rule.hits = hits.get(rule.name, 0)
+            self.buckets, self.rules = buckets, rules
+        except (OSError, ValueError, KeyError, re.error) as e:
+            logger.error("Failed to load the auto delete rules from %s, keeping the previous rules: %s", self.path, e)
+        else:
+            logger.debug("Loaded %d auto delete rules.", len(self.rules))
+        self._mtime = mtime
+
+    def maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at >= RELOAD_INTERVAL:
+            self._checked_at = now
+            self.load()
+
+    @staticmethod
+    def compile(config: List[dict]) -> Tuple[Dict[Tuple[int, int], RuleBucket], List[Rule]]:
+        patterns: Dict[Tuple[int, int], Dict[str, List[str]]] = {}
+        buckets: Dict[Tuple[int, int], RuleBucket] = {}
+        rules = []
+        for i, entry in enumerate(config):
+            key = (int(entry["channel_id"]), int(entry["webhook_id"]))
+            bucket = buckets.setdefault(key, RuleBucket())
+            fields = patterns.setdefault(key, {"title": [], "description": []})
+
+            group = f"r{i}"
+            action = entry.get("action", "delete")
+            if action not in ACTIONS:
+                raise ValueError(f"Unknown action {action!r} in the rule {entry.get('name', group)!r}.")
+            rule = Rule(entry.get("name", group), action)
+            bucket.rules[group] = rule
+            rules.append(rule)
+            for field, alternatives in fields.items():
+                value = entry.get(field)
+                # A single string would otherwise be joined character by character, matching almost anything
+                if value is not None and not (
+                    isinstance(value, list) and all(isinstance(pattern, str) for pattern in value)
+                ):
+                    raise ValueError(f"The {field} of the rule {rule.name!r} has to be a list of patterns.")
+                if value:
+                    # Validate each pattern on its own, so errors point at the rule
+                    for pattern in entry[field]:
+                        re.compile(pattern)
+                    alternatives.append(f"(?P<{group}>{'|'.join(f'(?:{p})' for p in entry[field])})")
+
+        for key, fields in patterns.items():
+            if fields["title"]:
+                buckets[key].title = re.compile("|".join(fields["title"]))
+            if fields["description"]:
+                buckets[key].description = re.compile("|".join(fields["description"]))
+        return buckets, rules
+
+
+ENGINE = RuleEngine(RULES_PATH)
+
+
+class SweepState:
+    """Last processed message ID per channel, persisted as JSON."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.last_ids: Dict[int, int] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.last_ids = {int(k): int(v) for k, v in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to read the sweep state from %s: %s", path, e)
+
+        # Set once a sweep completed, until then the offline backlog may still be unswept
+        self.caught_up = False
+
+    def advance(self, channel_id: int, message_id: int) -> None:
+        if message_id > self.last_ids.get(channel_id, 0):
+            self.last_ids[channel_id] = message_id
+
+    def advance_live(self, channel_id: int, message_id: int) -> None:
+        """Advances for a message deleted as it arrived, which must not skip the backlog before a sweep."""
+        if self.caught_up:
+            self.advance(channel_id, message_id)
+
+    def save(self) -> None:
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({str(k): v for k, v in self.last_ids.items()}, f)
+        except OSError as e:
+            logger.warning("Failed to save the sweep state to %s: %s", self.path, e)
+
+
+STATE = SweepState(STATE_PATH)
+_sweep_lock = asyncio.Lock()
+_startup_task: Optional[asyncio.Task] = None
+_original_parser: Optional[Callable[[Any], None]] = None
+_delete_tasks: Set[asyncio.Task] = set()
+
+
+def match_message(message: discord.Message) -> Optional[Rule]:
+    bucket = ENGINE.buckets.get((message.channel.id, message.webhook_id))
+    if bucket is None or not message.embeds:
+        return None
+    embed = message.embeds[0]
+    rule = bucket.match(embed.title, embed.description)
+    if rule is not None:
+        rule.hits += 1
+    return rule
+
 
 async def on_message(message: discord.Message):
-    if message.channel.id != CHANNEL_ID or message.webhook_id != WEBHOOK_ID:
+    if message.webhook_id is None:
+        return
+    ENGINE.maybe_reload()
+    rule = match_message(message)
+    if rule is None:
         return
-    if message.embeds and message.embeds[0].title:
-        title = message.embeds[0].title
-        if title.startswith("[modmail] None on") or (('[modmail] Python' in title or
-                                                      '[modmail] GitHub Actions checks' in title)
-                                                     and 'success on' in title):
+    STATE.advance_live(message.channel.id, message.id)
+    if rule.action == "delete":
+        await message.delete()
+
+
+def match_payload(data: dict) -> Optional[Rule]:
+    """`match_message` on a raw `MESSAGE_CREATE` payload, only the first embed is read."""
+    webhook_id = data.get("webhook_id")
+    if webhook_id is None:
+        return None
+    bucket = ENGINE.buckets.get((int(data["channel_id"]), int(webhook_id)))
+    if bucket is None:
+        return None
+    embeds = data.get("embeds")
+    if not embeds:
+        return None
+    rule = bucket.match(embeds[0].get("title"), embeds[0].get("description"))
+    if rule is not None:
+        rule.hits += 1
+    return rule
+
+
+async def delete_by_id(bot: Bot, channel_id: int, message_id: int) -> None:
+    try:
+        await bot.http.delete_message(channel_id, message_id)
+    except discord.NotFound:
+        pass
+    except discord.HTTPException as e:
+        logger.warning("Failed to delete webhook message %s: %s", message_id, e)
+
+
+def install_raw_parser(bot: Bot) -> None:
+    """
+    Wraps discord.py's `MESSAGE_CREATE` parser, there is no public event carrying the raw payload
+    before the message object is built. Payloads that don't match are passed on untouched.
+    """
+    global _original_parser
+    parsers = bot._connection.parsers
+    original = _original_parser = parsers["MESSAGE_CREATE"]
+
+    def parse_message_create(data: dict) -> None:
+        if "webhook_id" not in data:
+            return original(data)
+        ENGINE.maybe_reload()
+        rule = match_payload(data)
+        if rule is None or rule.action != "delete":
+            return original(data)
+
+        channel_id, message_id = int(data["channel_id"]), int(data["id"])
+        STATE.advance_live(channel_id, message_id)
+        task = bot.loop.create_task(delete_by_id(bot, channel_id, message_id))
+        _delete_tasks.add(task)
+        task.add_done_callback(_delete_tasks.discard)
+
+    parsers["MESSAGE_CREATE"] = parse_message_create
+
+
+def uninstall_raw_parser(bot: Bot) -> None:
+    global _original_parser
+    if _original_parser is not None:
+        bot._connection.parsers["MESSAGE_CREATE"] = _original_parser
+        _original_parser = None
+
+
+async def flush_deletes(channel: discord.TextChannel, messages: List[discord.Message]) -> int:
+    """Deletes in bulk of up to 100 messages, falling back to single deletes for old messages."""
+    cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+    recent = [message for message in messages if message.created_at > cutoff]
+    old = [message for message in messages if message.created_at <= cutoff]
+
+    deleted = 0
+    for i in range(0, len(recent), 100):
+        batch = recent[i : i + 100]
+        try:
+            await channel.delete_messages(batch)
+        except discord.NotFound:
+            # Some were already deleted, the rest are handled one by one
+            old.extend(batch)
+        else:
+            deleted += len(batch)
+    for message in old:
+        try:
             await message.delete()
+        except discord.NotFound:
+            continue
+        deleted += 1
+    return deleted
+
+
+async def _newest_oldest_first(channel: discord.TextChannel, limit: int) -> AsyncIterator[discord.Message]:
+    """The newest `limit` messages, yielded oldest first. Without `after`, `oldest_first` reads from the channel start."""
+    messages = [message async for message in channel.history(limit=limit)]
+    for message in reversed(messages):
+        yield message
+
+
+async def sweep(bot: Bot) -> int:
+    """Deletes the matching messages posted since the last processed message of every rule channel."""
+    async with _sweep_lock:
+        ENGINE.load()
+        deleted = 0
+        for channel_id in {channel_id for channel_id, _ in ENGINE.buckets}:
+            channel = bot.get_channel(channel_id)
+            if channel is None:
+                continue
+
+            last_id = STATE.last_ids.get(channel_id)
+            if last_id is None:
+                history = _newest_oldest_first(channel, INITIAL_SWEEP_LIMIT)
+            else:
+                history = channel.history(limit=None, after=discord.Object(last_id), oldest_first=True)
+
+            # Only advanced past messages once the matches among them are deleted
+            matches = []
+            scanned_id = None
+            async for message in history:
+                if message.webhook_id is not None:
+                    rule = match_message(message)
+                    if rule is not None and rule.action == "delete":
+                        matches.append(message)
+                scanned_id = message.id
+                if len(matches) >= 100:
+                    deleted += await flush_deletes(channel, matches)
+                    matches = []
+                    STATE.advance(channel_id, scanned_id)
+            deleted += await flush_deletes(channel, matches)
+            if scanned_id is not None:
+                STATE.advance(channel_id, scanned_id)
+        STATE.caught_up = True
+        STATE.save()
+        return deleted
+
+
+async def _startup_sweep(bot: Bot):
+    await bot.wait_until_ready()
+    try:
+        deleted = await sweep(bot)
+    except discord.HTTPException as e:
+        logger.warning("Startup sweep of webhook messages failed: %s", e)
+    else:
+        logger.info("Startup sweep deleted %d webhook messages.", deleted)
+
+
+@commands.command()
+@checks.has_permissions(PermissionLevel.ADMINISTRATOR)
+async def sweepwebhooks(ctx):
+    """
+    Deletes the matching webhook messages posted since the last sweep.
+    """
+    async with ctx.typing():
+        deleted = await sweep(ctx.bot)
+    await ctx.send(f"Deleted {deleted} webhook messages.")
+
+
+@commands.command()
+@checks.has_permissions(PermissionLevel.ADMINISTRATOR)
+async def webhookrules(ctx):
+    """
+    Lists the auto delete rules and how many messages each matched.
+    """
+    ENGINE.load()
+    if not ENGINE.rules:
+        return await ctx.send("There are no auto delete rules.")
+    lines = [f"`{rule.name}` ({rule.action}): {rule.hits} hits" for rule in ENGINE.rules]
+    await ctx.send("\n".join(lines)[:2000])
 
 
 async def setup(bot: Bot):
-    bot.add_listener(on_message)
+    global _startup_task
+    if RAW_GATEWAY:
+        install_raw_parser(bot)
+    else:
+        bot.add_listener(on_message)
+    bot.add_command(sweepwebhooks)
+    bot.add_command(webhookrules)
+    _startup_task = bot.loop.create_task(_startup_sweep(bot))
 
 
 async def teardown(bot):
+    uninstall_raw_parser(bot)
     bot.remove_listener(on_message)
+    bot.remove_command(sweepwebhooks.name)
+    bot.remove_command(webhookrules.name)
+    if _startup_task is not None:
+        _startup_task.cancel()
+    STATE.save()
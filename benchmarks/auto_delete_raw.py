@@ -0,0 +1,185 @@
+"""
+Per-event cost of auto_delete_webhook_messages on the `on_message` listener versus the raw gateway path.
+
+    python benchmarks/auto_delete_raw.py [--events N] [--webhook-ratio R]
+
+Generated `MESSAGE_CREATE` payloads go through discord.py's own parser of an offline bot,
+so the listener path pays for building, caching and dispatching every message.
+Reports CPU time per event, peak traced memory, memory still held afterwards and cached messages.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import importlib.util
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+import discord
+from discord.ext import commands
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import install_modmail_modules, next_id  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+GUILD_ID = 365960823622991872
+
+TITLES = [
+    "[modmail] None on development",
+    "[modmail] Python: success on master",
+    "[modmail] GitHub Actions checks failure on development",
+    "[modmail] New comment on pull request #3300",
+]
+
+
+def load_plugin():
+    install_modmail_modules()
+    os.environ.setdefault("AUTO_DELETE_STATE_PATH", os.path.join(tempfile.gettempdir(), "bench_sweep_state.json"))
+    name = "auto_delete_webhook_messages"
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", ROOT / name / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def user_payload(channel_id: int) -> dict:
+    author_id = random.randrange(10**17, 10**18)
+    return {
+        "id": str(next_id()),
+        "channel_id": str(channel_id),
+        "guild_id": str(GUILD_ID),
+        "type": 0,
+        "content": "did you set the prefix? I'm on the latest version and restarted twice",
+        "author": {"id": str(author_id), "username": f"user{author_id % 10000}", "discriminator": "0", "avatar": None},
+        "member": {"roles": [], "joined_at": "2023-01-01T00:00:00+00:00", "deaf": False, "mute": False},
+        "timestamp": "2026-10-18T12:00:00.000000+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "flags": 0,
+    }
+
+
+def webhook_payload(channel_id: int, webhook_id: int) -> dict:
+    data = user_payload(channel_id)
+    data.pop("member")
+    data["webhook_id"] = str(webhook_id)
+    data["author"] = {"id": str(webhook_id), "username": "GitHub", "discriminator": "0000", "avatar": None, "bot": True}
+    data["content"] = ""
+    data["embeds"] = [
+        {
+            "type": "rich",
+            "title": random.choice(TITLES),
+            "url": "https://github.com/modmail-dev/modmail/commit/0123456789abcdef",
+            "description": "[`0123456`](https://github.com/modmail-dev/modmail/commit/0123456) Fix things - octocat",
+            "color": 7506394,
+            "author": {"name": "octocat", "icon_url": "https://avatars.githubusercontent.com/u/583231"},
+        }
+    ]
+    return data
+
+
+def generate(module, events: int, webhook_ratio: float) -> List[dict]:
+    other_channel = next_id()
+    return [
+        webhook_payload(module.CHANNEL_ID, module.WEBHOOK_ID)
+        if random.random() < webhook_ratio
+        else user_payload(other_channel)
+        for _ in range(events)
+    ]
+
+
+class BenchmarkBot(commands.Bot):
+    async def on_message(self, message):
+        # Modmail's own message handling costs the same on both paths, leave it out
+        pass
+
+
+async def run_mode(raw: bool, payloads: List[dict], trace: bool) -> dict:
+    module = load_plugin()
+    module.RAW_GATEWAY = raw
+    module._startup_sweep = lambda bot: asyncio.sleep(0)
+
+    bot = BenchmarkBot(command_prefix="?", intents=discord.Intents.default(), max_messages=1000)
+    deleted = []
+
+    async def delete_message(channel_id, message_id, *, reason=None):
+        deleted.append(message_id)
+
+    async with bot:
+        bot.http.delete_message = delete_message
+        await module.setup(bot)
+        parse = bot._connection.parsers["MESSAGE_CREATE"]
+
+        gc.collect()
+        if trace:
+            tracemalloc.start()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        for data in payloads:
+            parse(data)
+            # Let the dispatched listeners and deletes run, like the gateway loop would between events
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall - 0.01
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        if trace:
+            tracemalloc.stop()
+
+        result = {
+            "cpu_us": cpu / len(payloads) * 1e6,
+            "wall_us": wall / len(payloads) * 1e6,
+            "peak_kib": (peak - start_memory) / 1024,
+            "retained_kib": (current - start_memory) / 1024,
+            "cached": len(bot.cached_messages),
+            "deleted": len(deleted),
+        }
+        await module.teardown(bot)
+    return result
+
+
+async def main_async(events: int, webhook_ratio: float) -> None:
+    random.seed(0)
+    payloads = generate(load_plugin(), events, webhook_ratio)
+    print(f"{events} events, {webhook_ratio:.0%} from the webhook")
+    print(f"{'path':<10} {'cpu/event':>10} {'wall/event':>11} {'peak mem':>10} {'retained':>10} {'cached':>7} {'deleted':>8}")
+    for raw in (False, True):
+        # Payloads are parsed in place by discord.py, every run gets its own copies.
+        # Timed without tracing, tracemalloc slows every allocation down
+        r = await run_mode(raw, [dict(data) for data in payloads], trace=False)
+        memory = await run_mode(raw, [dict(data) for data in payloads], trace=True)
+        r.update(peak_kib=memory["peak_kib"], retained_kib=memory["retained_kib"])
+        print(
+            f"{'raw' if raw else 'listener':<10} {r['cpu_us']:>8.1f}µs {r['wall_us']:>9.1f}µs "
+            f"{r['peak_kib']:>7.0f}KiB {r['retained_kib']:>7.0f}KiB {r['cached']:>7} {r['deleted']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--webhook-ratio", type=float, default=0.1, help="share of events posted by the webhook")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main_async(args.events, args.webhook_ratio))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Stand-ins for Modmail's modules and Discord objects, so the plugins can run without a live bot.
+"""
+from __future__ import annotations
+
+import enum
+import itertools
+import logging
+import sys
+import types
+from typing import List, Optional
+
+import discord
+
+_ids = itertools.count(1_000_000_000_000_000_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+def install_modmail_modules() -> None:
+    """Registers minimal `core`, `cogs.utility` and `bot` modules the plugins import."""
+    if "core" in sys.modules:
+        return
+
+    class PermissionLevel(enum.IntEnum):
+        OWNER = 5
+        ADMINISTRATOR = 4
+        ADMIN = 4
+        MODERATOR = 3
+        MOD = 3
+        SUPPORTER = 2
+        RESPONDER = 2
+        REGULAR = 1
+        INVALID = -1
+
+    def passthrough(*args, **kwargs):
+        return lambda func: func
+
+    class EmbedPaginatorSession:
+        def __init__(self, ctx, *embeds, **options):
+            self.ctx = ctx
+            self.embeds = embeds
+
+        async def run(self):
+            await self.ctx.send(embed=self.embeds[0])
+
+    class UnseenFormatter:
+        def format(self, value, **kwargs):
+            return str(value)
+
+    def human_join(seq, delim=", ", final="and"):
+        seq = list(seq)
+        if len(seq) <= 1:
+            return "".join(seq)
+        return f"{delim.join(seq[:-1])} {final} {seq[-1]}"
+
+    modules = {
+        "core": {},
+        "core.checks": {"has_permissions": passthrough, "thread_only": passthrough},
+        "core.models": {
+            "PermissionLevel": PermissionLevel,
+            "UnseenFormatter": UnseenFormatter,
+            "getLogger": logging.getLogger,
+        },
+        "core.utils": {"getLogger": logging.getLogger, "human_join": human_join},
+        "core.paginator": {"EmbedPaginatorSession": EmbedPaginatorSession},
+        "cogs": {},
+        "cogs.utility": {"PermissionLevel": PermissionLevel, "UnseenFormatter": UnseenFormatter},
+        "bot": {"ModmailBot": object},
+    }
+    for name, attributes in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        sys.modules[name] = module
+    sys.modules["core"].checks = sys.modules["core.checks"]
+
+
+class FakeUser:
+    def __init__(self, bot: bool = False, user_id: Optional[int] = None):
+        self.id = user_id or next_id()
+        self.bot = bot
+        self.name = f"user{self.id % 10000}"
+        self.mention = f"<@{self.id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel:
+    """Records what is sent instead of calling Discord."""
+
+    def __init__(self, channel_id: Optional[int] = None):
+        self.id = channel_id or next_id()
+        self.sent: List[dict] = []
+        self.edited: List[dict] = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append({"content": content, **kwargs})
+        return FakeMessage(content=content or "", channel=self, author=FakeUser(bot=True))
+
+    def get_partial_message(self, message_id: int) -> FakePartialMessage:
+        return FakePartialMessage(self, message_id)
+
+
+class FakePartialMessage:
+    def __init__(self, channel: FakeChannel, message_id: int):
+        self.channel = channel
+        self.id = message_id
+
+    async def edit(self, **kwargs):
+        self.channel.edited.append({"id": self.id, **kwargs})
+
+
+class FakeMessage:
+    def __init__(
+        self,
+        content: str = "",
+        channel: Optional[FakeChannel] = None,
+        author: Optional[FakeUser] = None,
+        webhook_id: Optional[int] = None,
+        embeds: Optional[List[discord.Embed]] = None,
+    ):
+        self.id = next_id()
+        self.content = content
+        self.channel = channel or FakeChannel()
+        self.author = author or FakeUser()
+        self.webhook_id = webhook_id
+        self.embeds = embeds or []
+        self.deleted = False
+
+    async def delete(self, *, delay=None):
+        self.deleted = True
+
+
+class FakeThread:
+    def __init__(self, recipient: Optional[FakeUser] = None):
+        self.recipient = recipient or FakeUser()
+        self.recipients = [self.recipient]
+        self.channel = FakeChannel()
+
+
+class FakeBot:
+    """The attributes of `ModmailBot` the benchmarked plugins use."""
+
+    def __init__(self, session=None):
+        self.session = session
+        self.main_color = 0x7289DA
+        self.prefix = "?"
+        self.cached_messages = []
+        self.extra_events = {}
+        self.channels = {}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    @property
+    def loop(self):
+        import asyncio
+
+        return asyncio.get_running_loop()
@@ -0,0 +1,159 @@
+"""
+Local aiohttp server emulating the GitHub REST and GraphQL endpoints the github plugin uses,
+with ETags, rate limit headers and injected latency.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import zlib
+from typing import Optional
+
+from aiohttp import web
+
+# Even numbers are pull requests, odd numbers issues, numbers past this don't exist
+MAX_NUMBER = 100_000
+
+
+def _payload(owner: str, repo: str, number: int, pull: bool) -> dict:
+    data = {
+        "number": number,
+        "title": f"Benchmark {'pull request' if pull else 'issue'} {number}",
+        "body": "Lorem ipsum dolor sit amet. " * 20,
+        "html_url": f"https://github.com/{owner}/{repo}/{'pull' if pull else 'issues'}/{number}",
+        "state": "open" if number % 3 else "closed",
+        "user": {
+            "login": "octocat",
+            "avatar_url": "https://avatars.githubusercontent.com/u/583231",
+            "html_url": "https://github.com/octocat",
+        },
+        "labels": [{"name": "bug"}, {"name": "benchmark"}],
+    }
+    if pull:
+        data.update(merged=number % 3 == 0, additions=number % 500, deletions=number % 70, commits=number % 9 + 1)
+    return data
+
+
+class GitHubStandIn:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.01, limit: int = 5000):
+        self.latency = latency
+        self.jitter = jitter
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = int(time.time()) + 3600
+        self.requests = 0
+        self.not_modified = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get("/repos/{owner}/{repo}/issues/{number}", self._issue)
+        app.router.add_get("/repos/{owner}/{repo}/pulls/{number}", self._pull)
+        app.router.add_post("/graphql", self._graphql)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _headers(self, resource: str) -> dict:
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.remaining, 0)),
+            "X-RateLimit-Reset": str(self.reset_at),
+            "X-RateLimit-Resource": resource,
+        }
+
+    async def _respond(self, request: web.Request, payload: Optional[dict], etag: str, resource: str = "core"):
+        self.requests += 1
+        if payload is not None:
+            # Changes with the content, like GitHub's
+            checksum = zlib.crc32(json.dumps(payload, sort_keys=True).encode())
+            etag = '"%s/%x"' % (etag.strip('"'), checksum)
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if request.headers.get("If-None-Match") == etag:
+            # Conditional requests don't count against the rate limit
+            self.not_modified += 1
+            return web.Response(status=304, headers={**self._headers(resource), "ETag": etag})
+
+        if self.remaining <= 0:
+            return web.json_response(
+                {"message": "API rate limit exceeded"}, status=403, headers=self._headers(resource)
+            )
+        self.remaining -= 1
+        if payload is None:
+            return web.json_response({"message": "Not Found"}, status=404, headers=self._headers(resource))
+        return web.json_response(payload, headers={**self._headers(resource), "ETag": etag})
+
+    async def _issue(self, request: web.Request):
+        owner, repo, number = request.match_info["owner"], request.match_info["repo"], int(request.match_info["number"])
+        payload = None
+        if number <= MAX_NUMBER:
+            payload = _payload(owner, repo, number, pull=False)
+            if number % 2 == 0:
+                payload["pull_request"] = {"url": f"{self.url}/repos/{owner}/{repo}/pulls/{number}"}
+        return await self._respond(request, payload, f'"{owner}/{repo}/issues/{number}"')
+
+    async def _pull(self, request: web.Request):
+        owner, repo, number = request.match_info["owner"], request.match_info["repo"], int(request.match_info["number"])
+        payload = _payload(owner, repo, number, pull=True) if number <= MAX_NUMBER and number % 2 == 0 else None
+        return await self._respond(request, payload, f'"{owner}/{repo}/pulls/{number}"')
+
+    async def _graphql(self, request: web.Request):
+        body = await request.json()
+        variables = body.get("variables", {})
+        data = {}
+        for key, number in variables.items():
+            if not key.startswith("number"):
+                continue
+            index = key[len("number") :]
+            owner, repo = variables[f"owner{index}"], variables[f"name{index}"]
+            node = None
+            if number <= MAX_NUMBER:
+                rest = _payload(owner, repo, number, pull=number % 2 == 0)
+                node = {
+                    "__typename": "PullRequest" if number % 2 == 0 else "Issue",
+                    "number": number,
+                    "title": rest["title"],
+                    "body": rest["body"],
+                    "url": rest["html_url"],
+                    "state": "MERGED" if rest.get("merged") else rest["state"].upper(),
+                    "author": {"login": "octocat", "avatarUrl": rest["user"]["avatar_url"], "url": rest["user"]["html_url"]},
+                    "labels": {"nodes": rest["labels"]},
+                }
+                if number % 2 == 0:
+                    node.update(
+                        merged=rest["merged"],
+                        additions=rest["additions"],
+                        deletions=rest["deletions"],
+                        commits={"totalCount": rest["commits"]},
+                    )
+            data[f"r{index}"] = {"issueOrPullRequest": node}
+        return await self._respond(request, {"data": data}, f'"graphql/{time.monotonic()}"', resource="graphql")
+
+
+class RewritingSession:
+    """Sends the plugin's `https://api.github.com` requests to the stand-in."""
+
+    def __init__(self, session, base_url: str):
+        self._session = session
+        self._base_url = base_url
+
+    def _rewrite(self, url: str) -> str:
+        return url.replace("https://api.github.com", self._base_url, 1)
+
+    def get(self, url: str, **kwargs):
+        return self._session.get(self._rewrite(url), **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self._session.post(self._rewrite(url), **kwargs)
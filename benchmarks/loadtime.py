@@ -0,0 +1,131 @@
+"""
+Import and `setup()` cost of every plugin, each loaded in a fresh interpreter.
+
+    python benchmarks/loadtime.py [plugin...] [--repeat N] [--budget-ms MS] [--preload MODULE ...]
+
+discord.py and aiohttp are imported before the plugin is, as the bot already has them loaded.
+Modmail itself also imports motor, add `--preload motor.motor_asyncio` to mirror a full bot.
+With `--budget-ms` the exit status is 1 when the plugins together load slower than the budget.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE = ["discord", "discord.ext.commands", "aiohttp"]
+
+
+def discover_plugins() -> List[str]:
+    return sorted(path.parent.name for path in ROOT.glob("*/*.py") if path.stem == path.parent.name)
+
+
+async def profile_setup(module) -> float:
+    import aiohttp
+    import discord
+    from discord.ext import commands
+
+    class ProfilingBot(commands.Bot):
+        main_color = 0x7289DA
+        prefix = "?"
+
+        async def wait_until_ready(self):
+            # Never ready, background tasks waiting for it stay idle
+            await asyncio.Event().wait()
+
+    bot = ProfilingBot(command_prefix="?", intents=discord.Intents.none(), help_command=None)
+    async with bot:
+        async with aiohttp.ClientSession() as session:
+            bot.session = session
+            start = time.perf_counter()
+            await module.setup(bot)
+            elapsed = time.perf_counter() - start
+            for name in list(bot.cogs):
+                await bot.remove_cog(name)
+            teardown = getattr(module, "teardown", None)
+            if teardown is not None:
+                await teardown(bot)
+    return elapsed
+
+
+def child(name: str, preload: List[str]) -> Dict[str, object]:
+    """Loads one plugin, run in its own interpreter."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from fakes import install_modmail_modules
+
+    logging.basicConfig(level=logging.CRITICAL)
+    install_modmail_modules()
+    for module_name in BASELINE + preload:
+        importlib.import_module(module_name)
+
+    before = set(sys.modules)
+    spec = importlib.util.spec_from_file_location(f"plugins.{name}", ROOT / name / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    start = time.perf_counter()
+    spec.loader.exec_module(module)
+    import_time = time.perf_counter() - start
+    imported = sorted({module_name.split(".")[0] for module_name in set(sys.modules) - before})
+
+    setup_time = asyncio.run(profile_setup(module))
+    return {"import": import_time, "setup": setup_time, "imported": imported}
+
+
+def run_child(name: str, preload: List[str]) -> Dict[str, object]:
+    result = subprocess.run(
+        [sys.executable, __file__, "--child", name, *(f"--preload={module}" for module in preload)],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "GITHUB_CACHE_PATH": os.getenv("GITHUB_CACHE_PATH", ":memory:")},
+    )
+    if result.returncode:
+        raise RuntimeError(f"Loading {name} failed:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("plugins", nargs="*", metavar="plugin", help="plugin folders to load (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="loads per plugin, the median is reported")
+    parser.add_argument("--budget-ms", type=float, help="fail when the plugins together take longer")
+    parser.add_argument("--preload", action="append", default=[], help="module the bot has already imported")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.preload)))
+        return
+
+    plugins = args.plugins or discover_plugins()
+    unknown = set(plugins) - set(discover_plugins())
+    if unknown:
+        parser.error(f"unknown plugins: {', '.join(sorted(unknown))}")
+
+    total = 0.0
+    print(f"{'plugin':<30} {'import':>9} {'setup':>9}  new top-level imports")
+    for name in plugins:
+        runs = [run_child(name, args.preload) for _ in range(args.repeat)]
+        import_ms = statistics.median(run["import"] for run in runs) * 1000
+        setup_ms = statistics.median(run["setup"] for run in runs) * 1000
+        total += import_ms + setup_ms
+        imported = ", ".join(module for module in runs[0]["imported"] if not module.startswith("_")) or "-"
+        print(f"{name:<30} {import_ms:>7.1f}ms {setup_ms:>7.1f}ms  {imported}")
+    print(f"{'total':<30} {total:>17.1f}ms")
+
+    if args.budget_ms is not None and total > args.budget_ms:
+        print(f"Over the startup budget of {args.budget_ms:.0f}ms by {total - args.budget_ms:.1f}ms.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
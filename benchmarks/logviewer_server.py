@@ -0,0 +1,54 @@
+"""
+Local aiohttp server standing in for hosted logviewers, served at `/<name>/`.
+
+Instances whose name hashes into `down_ratio` answer 503, into `slow_ratio` take `slow_latency` seconds.
+"""
+from __future__ import annotations
+
+import asyncio
+import zlib
+from typing import Optional
+
+from aiohttp import web
+
+
+class LogviewerStandIn:
+    def __init__(self, latency: float = 0.02, down_ratio: float = 0.1, slow_ratio: float = 0.05, slow_latency: float = 5):
+        self.latency = latency
+        self.down_ratio = down_ratio
+        self.slow_ratio = slow_ratio
+        self.slow_latency = slow_latency
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/{name}/", self._instance)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def instance_url(self, instance: dict) -> str:
+        return f"{self.url}/{instance['name']}/"
+
+    async def _instance(self, request: web.Request):
+        self.requests += 1
+        # Stable per name, so a probed instance keeps its state
+        bucket = zlib.crc32(request.match_info["name"].encode()) % 1000 / 1000
+        if bucket < self.down_ratio:
+            await asyncio.sleep(self.latency)
+            return web.Response(status=503)
+        if bucket < self.down_ratio + self.slow_ratio:
+            await asyncio.sleep(self.slow_latency)
+        else:
+            await asyncio.sleep(self.latency)
+        return web.Response(text="<html>logviewer</html>", content_type="text/html")
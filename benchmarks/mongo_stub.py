@@ -0,0 +1,161 @@
+"""
+In-process stand-in for the parts of Motor the logviewerhosting plugin uses on
+`logviewer_management.instances`, with injected latency per round trip.
+
+Set `BENCH_MONGO_URI` to benchmark against a local mongod instead, see `seed_instances`.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pymongo.errors import OperationFailure
+
+
+def _matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        value = document.get(key)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return dict(document)
+    included = [key for key, value in projection.items() if value and key != "_id"]
+    if included:
+        result = {key: document[key] for key in included if key in document}
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", documents: List[dict]):
+        self._collection = collection
+        self._documents = documents
+        self._batch_size = 101
+
+    def batch_size(self, size: int) -> "FakeCursor":
+        self._batch_size = size
+        return self
+
+    async def __aiter__(self):
+        for i, document in enumerate(self._documents):
+            if i % self._batch_size == 0:
+                await self._collection.round_trip()
+            yield document
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        documents = []
+        async for document in self:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        if not self._documents:
+            await self._collection.round_trip()
+        return documents
+
+
+class FakeCollection:
+    def __init__(self, latency: float = 0.002):
+        self.latency = latency
+        self.documents: List[dict] = []
+        self.queries = 0
+
+    async def round_trip(self) -> None:
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+
+    def find(self, query: dict, projection: Optional[dict] = None) -> FakeCursor:
+        return FakeCursor(
+            self, [_project(document, projection) for document in self.documents if _matches(document, query)]
+        )
+
+    def aggregate(self, pipeline: List[dict]) -> FakeCursor:
+        documents = list(self.documents)
+        for stage in pipeline:
+            if "$match" in stage:
+                documents = [document for document in documents if _matches(document, stage["$match"])]
+            elif "$group" in stage:
+                key = stage["$group"]["_id"].lstrip("$")
+                groups = {}
+                for document in documents:
+                    groups[document[key]] = groups.get(document[key], 0) + 1
+                documents = [{"_id": owner, "count": count} for owner, count in groups.items()]
+            elif "$sort" in stage:
+                for field, direction in reversed(list(stage["$sort"].items())):
+                    documents.sort(key=lambda document: document[field], reverse=direction < 0)
+            elif "$limit" in stage:
+                documents = documents[: stage["$limit"]]
+        return FakeCursor(self, documents)
+
+    async def index_information(self) -> dict:
+        await self.round_trip()
+        return {
+            "_id_": {"key": [("_id", 1)]},
+            "owner_1_active_1": {"key": [("owner", 1), ("active", 1)]},
+        }
+
+    def watch(self, *args, **kwargs):
+        # Like a standalone mongod, the plugin falls back to polling
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class FakeDatabase:
+    def __init__(self, collection: FakeCollection):
+        self._collection = collection
+
+    def get_collection(self, name: str) -> FakeCollection:
+        return self._collection
+
+
+class FakeMotorClient:
+    def __init__(self, collection: FakeCollection):
+        self.collection = collection
+
+    def get_database(self, name: str) -> FakeDatabase:
+        return FakeDatabase(self.collection)
+
+    def close(self) -> None:
+        pass
+
+
+def generate_instances(owners: List[int], hosting_ratio: float = 0.1, max_instances: int = 5) -> List[dict]:
+    """Most owners host nothing, the others between one and `max_instances` logviewers."""
+    now = datetime.now(timezone.utc)
+    documents = []
+    for owner in owners:
+        if random.random() >= hosting_ratio:
+            continue
+        for i in range(random.randint(1, max_instances)):
+            documents.append(
+                {
+                    "owner": str(owner),
+                    "name": f"logs-{owner % 100000}-{i}",
+                    "active": True,
+                    "created_at": now - timedelta(days=random.randint(1, 400)),
+                    "mongo_uri": "mongodb://secret",
+                }
+            )
+    return documents
+
+
+async def seed_instances(uri: str, documents: List[dict]):
+    """Replaces `logviewer_management.instances` of a local mongod, returns its collection."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(uri, serverSelectionTimeoutMS=2000)
+    collection = client.get_database("logviewer_management").get_collection("instances")
+    await collection.delete_many({})
+    if documents:
+        await collection.insert_many([dict(document) for document in documents])
+    await collection.create_index([("owner", 1), ("active", 1)])
+    return client
@@ -0,0 +1,106 @@
+"""
+Concurrency check of rhelp's help embeds.
+
+    python benchmarks/rhelp_concurrency.py [--rounds N]
+
+Renders the help of many commands in parallel and fails when embeds leak between invocations,
+or when the bot-wide help command's `context`/`verify_checks` are changed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import random
+import sys
+from pathlib import Path
+
+import discord
+from discord.ext import commands
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import install_modmail_modules  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class SlowHelpCommand(commands.HelpCommand):
+    """Stands in for Modmail's help command, yielding mid-render like its permission checks do."""
+
+    async def _get_help_embed(self, command):
+        context = self.context
+        await asyncio.sleep(random.uniform(0, 0.005))
+        assert self.context is context, "help command context replaced while rendering"
+        assert self.verify_checks is False
+        embed = discord.Embed(title=command.qualified_name, description=f"context {id(context)}")
+        return embed, "SUPPORTER"
+
+
+class FakeContext:
+    clean_prefix = "?"
+
+
+class HelpBot(commands.Bot):
+    prefix = "?"
+    main_color = 0x7289DA
+
+
+def build_bot() -> HelpBot:
+    bot = HelpBot(command_prefix="?", intents=discord.Intents.none(), help_command=SlowHelpCommand())
+
+    async def callback(ctx):
+        pass
+
+    for i in range(20):
+        bot.add_command(commands.Command(callback, name=f"command{i}", help=f"Does thing {i}."))
+    group = commands.Group(callback, name="group", help="A group.")
+    for i in range(5):
+        group.add_command(commands.Command(callback, name=f"sub{i}", help=f"Sub command {i}."))
+    bot.add_command(group)
+    return bot
+
+
+async def check(rounds: int) -> None:
+    install_modmail_modules()
+    spec = importlib.util.spec_from_file_location("bench_rhelp", ROOT / "rhelp" / "rhelp.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    bot = build_bot()
+    original = bot.help_command
+    context = original.context
+    verify_checks = original.verify_checks
+    for _ in range(rounds):
+        cog = module.Rhelp(bot)
+        names = [command.qualified_name for command in bot.commands]
+        random.shuffle(names)
+        contexts = [FakeContext() for _ in names]
+        embeds = await asyncio.gather(
+            *(cog.get_help_embed(bot.get_command(name), ctx) for name, ctx in zip(names, contexts))
+        )
+        for name, ctx, embed in zip(names, contexts, embeds):
+            assert embed.title == name, f"{name} got the embed of {embed.title}"
+            assert embed.description == f"context {id(ctx)}", f"{name} was rendered with another context"
+
+        # Cached embeds are handed out as copies, changing one must not change the others
+        again = await asyncio.gather(*(cog.get_help_embed(bot.get_command(name), FakeContext()) for name in names * 2))
+        assert len({id(embed) for embed in again}) == len(again), "the same embed object was handed out twice"
+        again[0].add_field(name="changed", value="changed")
+        assert len(again[len(names)].fields) != len(again[0].fields), "cached embeds share their fields"
+
+        assert bot.help_command is original
+        assert original.context is context, "the bot-wide help command's context changed"
+        assert original.verify_checks == verify_checks, "the bot-wide help command's verify_checks changed"
+    print(f"{rounds} rounds of {len(names)} concurrent help embeds: ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(check(args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Offline benchmarks of the hot listeners, against local stand-ins for Discord, GitHub and Mongo.
+
+    python benchmarks/run.py [github] [auto_delete] [logviewer] [--messages N] [--output FILE]
+
+Latencies of the simulated services are set with `BENCH_GITHUB_LATENCY` and `BENCH_MONGO_LATENCY`,
+threads are opened at `BENCH_THREAD_RATE` per second, and `BENCH_MONGO_URI` runs the logviewer
+scenario against a real mongod instead of the in-memory collection.
+
+Every scenario replays a generated message stream through a freshly loaded plugin and reports
+throughput, p50/p99 latency per event, and the peak memory traced during a second run.
+Requires discord.py, aiohttp and motor, as installed alongside Modmail.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Awaitable, Callable, List, Tuple
+
+import aiohttp
+import discord
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fakes import FakeBot, FakeChannel, FakeMessage, FakeThread, FakeUser, install_modmail_modules  # noqa: E402
+from github_server import GitHubStandIn, RewritingSession  # noqa: E402
+from logviewer_server import LogviewerStandIn  # noqa: E402
+from mongo_stub import FakeCollection, FakeMotorClient, generate_instances, seed_instances  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+Scenario = Callable[[int], Awaitable[Tuple[List[float], float, str]]]
+
+
+def load_plugin(name: str):
+    """Imports a fresh copy of a plugin module from its folder."""
+    install_modmail_modules()
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", ROOT / name / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+CHATTER = [
+    "hey, my bot doesn't respond to commands anymore",
+    "did you set the prefix?",
+    "thanks, that fixed it!",
+    "check #support-guides for the setup",
+    "I'm on the latest version, restarted twice",
+    "what does the error in the console say?",
+]
+
+
+def github_stream(n: int) -> List[str]:
+    messages = []
+    for _ in range(n):
+        roll = random.random()
+        if roll < 0.85:
+            messages.append(random.choice(CHATTER))
+        else:
+            # Few references are linked far more often than the rest
+            refs = [
+                f"{random.choice(['modmail', 'logviewer', 'modmail-dev/modmail'])}#{int(random.paretovariate(1.2)) % 400 + 1}"
+                for _ in range(random.choice([1, 1, 1, 2, 3]))
+            ]
+            messages.append(f"this looks like {' and '.join(refs)}")
+    return messages
+
+
+async def run_concurrently(calls: List[Callable[[], Awaitable]], concurrency: int) -> Tuple[List[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(call):
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(call) for call in calls))
+    return latencies, time.perf_counter() - start
+
+
+async def github_scenario(n: int) -> Tuple[List[float], float, str]:
+    os.environ.setdefault("GITHUB_CACHE_PATH", ":memory:")
+    module = load_plugin("github")
+    server = GitHubStandIn(latency=float(os.getenv("BENCH_GITHUB_LATENCY", 0.05)))
+    base_url = await server.start()
+    async with aiohttp.ClientSession() as session:
+        bot = FakeBot(RewritingSession(session, base_url))
+        cog = module.GithubPlugin(bot)
+        channel = FakeChannel()
+        author = FakeUser()
+        messages = [FakeMessage(content, channel=channel, author=author) for content in github_stream(n)]
+        latencies, elapsed = await run_concurrently([lambda m=m: cog.on_message(m) for m in messages], 50)
+        await cog.cog_unload()
+    await server.stop()
+    detail = (
+        f"github requests={server.requests} (304: {server.not_modified}), "
+        f"cache hits={cog.cache.hits} misses={cog.cache.misses}, embeds sent={len(channel.sent)}"
+    )
+    return latencies, elapsed, detail
+
+
+async def auto_delete_scenario(n: int) -> Tuple[List[float], float, str]:
+    os.environ.setdefault("AUTO_DELETE_STATE_PATH", os.path.join(tempfile.gettempdir(), "bench_sweep_state.json"))
+    module = load_plugin("auto_delete_webhook_messages")
+    github_channel = FakeChannel(module.CHANNEL_ID)
+    other_channel = FakeChannel()
+    titles = [
+        "[modmail] None on development",
+        "[modmail] Python: success on master",
+        "[modmail] GitHub Actions checks failure on development",
+        "[modmail] New comment on pull request #3300",
+    ]
+
+    messages = []
+    for _ in range(n):
+        roll = random.random()
+        if roll < 0.9:
+            messages.append(FakeMessage(random.choice(CHATTER), channel=other_channel))
+        else:
+            messages.append(
+                FakeMessage(
+                    channel=github_channel,
+                    webhook_id=module.WEBHOOK_ID,
+                    embeds=[discord.Embed(title=random.choice(titles))],
+                )
+            )
+
+    latencies = []
+    start = time.perf_counter()
+    for message in messages:
+        event_start = time.perf_counter()
+        await module.on_message(message)
+        latencies.append(time.perf_counter() - event_start)
+    elapsed = time.perf_counter() - start
+    deleted = sum(message.deleted for message in messages)
+    return latencies, elapsed, f"deleted={deleted}"
+
+
+async def logviewer_scenario(n: int) -> Tuple[List[float], float, str]:
+    os.environ.setdefault("LOGVIEWER_PROBE_TIMEOUT", "1")
+    module = load_plugin("logviewerhosting")
+    owners = [FakeUser() for _ in range(max(10, n // 4))]
+    documents = generate_instances([owner.id for owner in owners])
+
+    uri = os.getenv("BENCH_MONGO_URI")
+    if uri:
+        client = await seed_instances(uri, documents)
+        collection = None
+    else:
+        collection = FakeCollection(latency=float(os.getenv("BENCH_MONGO_LATENCY", 0.002)))
+        collection.documents = documents
+        client = FakeMotorClient(collection)
+
+    logviewers = LogviewerStandIn()
+    await logviewers.start()
+
+    bot = FakeBot()
+    cog = module.LogviewerHosting(bot)
+    cog.management_db_client = client
+    cog.instance_url = logviewers.instance_url
+    loop = asyncio.get_running_loop()
+    cog._workers = [loop.create_task(cog.lookup_worker()) for _ in range(2)]
+
+    # Returning users open several threads
+    threads = [FakeThread(random.choice(owners)) for _ in range(n)]
+    # Threads are created at the pace of the gateway, not all at once
+    interval = 1 / float(os.getenv("BENCH_THREAD_RATE", 500))
+    latencies = []
+    start = time.perf_counter()
+    for i, thread in enumerate(threads):
+        event_start = time.perf_counter()
+        await cog.on_thread_ready(thread, thread.recipient, None, None)
+        latencies.append(time.perf_counter() - event_start)
+        await asyncio.sleep(max(0.0, start + (i + 1) * interval - time.perf_counter()))
+    await cog.lookup_queue.join()
+    await asyncio.gather(*cog._post_tasks)
+    elapsed = time.perf_counter() - start
+    await cog.cog_unload()
+    client.close()
+    await logviewers.stop()
+
+    sent = sum(len(thread.channel.sent) for thread in threads)
+    detail = (
+        f"queries={collection.queries if collection else 'n/a'}, embeds sent={sent}, dropped={cog.dropped_lookups}, "
+        f"queue wait: {cog.queue_wait.summary()}, query time: {cog.query_time.summary()}"
+    )
+    if cog.health is not None:
+        detail += (
+            f"\n  probes={logviewers.requests}, cached={cog.health.hits}, "
+            f"probe time: {cog.health.probe_time.summary()}"
+        )
+    return latencies, elapsed, detail
+
+
+SCENARIOS = {
+    "github": github_scenario,
+    "auto_delete": auto_delete_scenario,
+    "logviewer": logviewer_scenario,
+}
+
+
+async def run(names: List[str], messages: int) -> List[str]:
+    lines = []
+    for name in names:
+        random.seed(0)
+        latencies, elapsed, detail = await SCENARIOS[name](messages)
+
+        random.seed(0)
+        tracemalloc.start()
+        await SCENARIOS[name](messages)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        lines.append(
+            f"{name}: {len(latencies)} events in {elapsed:.3f}s ({len(latencies) / elapsed:,.0f}/s), "
+            f"p50={percentile(latencies, 0.5) * 1e6:,.1f}µs p99={percentile(latencies, 0.99) * 1e6:,.1f}µs, "
+            f"peak memory={peak / 1024:,.0f}KiB\n  {detail}"
+        )
+        print(lines[-1], flush=True)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--messages", type=int, default=2000, help="events replayed per scenario")
+    parser.add_argument("--output", help="also write the results to this file")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - SCENARIOS.keys()
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.ERROR)
+    lines = asyncio.run(run(args.scenarios or list(SCENARIOS), args.messages))
+    if args.output:
+        Path(args.output).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Tuple
+
 import discord
 from discord.ext import commands
 
@@ -9,27 +15,167 @@ from core.models import PermissionLevel, getLogger
 logger = getLogger(__name__)
 
 
+class PendingRename:
+    __slots__ = ("name", "fallback", "future", "history", "task")
+
+    def __init__(self):
+        self.name: Optional[str] = None
+        self.fallback: Optional[Callable[[], str]] = None
+        self.future: Optional[asyncio.Future] = None
+        # Monotonic timestamps of the renames within the current window
+        self.history: deque = deque()
+        self.task: Optional[asyncio.Task] = None
+
+
+class RenameScheduler:
+    """
+    Schedules channel renames within Discord's limit of 2 name edits per 10 minutes per channel.
+
+    Renames of a channel that can't run yet are coalesced, only the last requested name is applied.
+    """
+
+    RATE = 2
+    PER = 600
+
+    def __init__(self, concurrency: int = 2):
+        self.channels: Dict[int, PendingRename] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def eta(self, channel_id: int) -> float:
+        """Seconds until the channel can be renamed."""
+        state = self.channels.get(channel_id)
+        if state is None:
+            return 0
+        now = time.monotonic()
+        while state.history and now - state.history[0] >= self.PER:
+            state.history.popleft()
+        if len(state.history) < self.RATE:
+            return 0
+        return state.history[0] + self.PER - now
+
+    def schedule(
+        self, channel: discord.abc.GuildChannel, name: str, fallback: Optional[Callable[[], str]] = None
+    ) -> Tuple[float, asyncio.Future]:
+        """
+        Schedules a rename, replacing any pending rename of the channel.
+        `fallback` builds the name used when Discord rejects the name for its words.
+
+        Returns the seconds until it runs and a future resolved once it ran,
+        a replaced rename resolves with `False`.
+        """
+        state = self.channels.get(channel.id)
+        if state is None:
+            self._prune()
+            state = self.channels[channel.id] = PendingRename()
+        if state.future is not None and not state.future.done():
+            state.future.set_result(False)
+
+        state.name = name
+        state.fallback = fallback
+        state.future = asyncio.get_running_loop().create_future()
+        if state.task is None or state.task.done():
+            state.task = asyncio.create_task(self._run(channel, state))
+        return self.eta(channel.id), state.future
+
+    async def _run(self, channel: discord.abc.GuildChannel, state: PendingRename) -> None:
+        while state.name is not None:
+            delay = self.eta(channel.id)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            name, fallback, future = state.name, state.fallback, state.future
+            state.name = state.fallback = None
+            state.history.append(time.monotonic())
+            try:
+                async with self._semaphore:
+                    try:
+                        await channel.edit(name=name)
+                    except discord.HTTPException as e:
+                        if fallback is None or "Contains words not allowed" not in e.text:
+                            raise
+                        name = fallback()
+                        await channel.edit(name=name)
+            except Exception as e:
+                if future.done():
+                    logger.warning("Failed to rename channel %s: %s", channel.id, e)
+                else:
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(name)
+
+    def _prune(self) -> None:
+        """Forgets idle channels whose rename window has passed."""
+        for channel_id, state in list(self.channels.items()):
+            if (state.task is None or state.task.done()) and self.eta(channel_id) == 0:
+                del self.channels[channel_id]
+
+    def cancel_all(self) -> None:
+        for state in self.channels.values():
+            if state.task is not None:
+                state.task.cancel()
+        self.channels.clear()
+
+
 class ChannelRename(commands.Cog):
     """Plugin to rename a thread channel."""
 
     def __init__(self, bot):
         self.bot = bot
+        self.scheduler = RenameScheduler()
 
-    @commands.command()
-    @checks.has_permissions(PermissionLevel.MODERATOR)
-    @checks.thread_only()
-    async def rename(self, ctx, *, name: str):
+    async def cog_unload(self):
+        self.scheduler.cancel_all()
+
+    def format_channel_name(self, recipient, channel, force_null: bool = False) -> str:
         """
-        Rename the thread channel.
+        `bot.format_channel_name`, ignoring the thread's own channel when checking for taken names.
+        Not cached, the name depends on the config and on the other channels' names.
         """
+        return self.bot.format_channel_name(recipient, exclude_channel=channel, force_null=force_null)
+
+    @staticmethod
+    def _log_failure(channel_id: int):
+        """Done callback for renames nobody awaits."""
+
+        def callback(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is not None:
+                logger.warning("Failed to rename channel %s: %s", channel_id, future.exception())
+
+        return callback
+
+    async def _schedule_rename(self, ctx, name: str, fallback: Optional[Callable[[], str]] = None) -> None:
+        eta, future = self.scheduler.schedule(ctx.channel, name, fallback)
+        if eta > 0:
+            timestamp = discord.utils.format_dt(discord.utils.utcnow() + timedelta(seconds=eta), "R")
+            await ctx.reply(f"Channel will be renamed to `{name}` {timestamp} (Discord's rename limit).")
+            future.add_done_callback(self._log_failure(ctx.channel.id))
+            return
+
         try:
-            await ctx.channel.edit(name=name)
+            name = await future
         except discord.Forbidden:
             await ctx.reply("I do not have permission to edit channels.")
         except discord.HTTPException:
-            await ctx.reply("Failed to rename the channel, perhaps the name is invalid?")
+            if fallback is None:
+                await ctx.reply("Failed to rename the channel, perhaps the name is invalid?")
+            else:
+                await ctx.reply("Failed to reset the channel name. Try the rename command instead.")
         else:
-            await ctx.reply(f"Channel renamed to `{name}`")
+            if name:
+                await ctx.reply(f"Channel renamed to `{name}`")
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.MODERATOR)
+    @checks.thread_only()
+    async def rename(self, ctx, *, name: str):
+        """
+        Rename the thread channel.
+
+        Renames past Discord's limit of 2 per 10 minutes are queued, only the latest name is applied.
+        """
+        await self._schedule_rename(ctx, name)
 
     @commands.command()
     @checks.has_permissions(PermissionLevel.MODERATOR)
@@ -38,19 +184,45 @@ class ChannelRename(commands.Cog):
         """
         Reset the channel name back to the user's username.
         """
-        name = self.bot.format_channel_name(ctx.thread.recipient)
-        try:
-            await ctx.channel.edit(name=name)
-        except discord.Forbidden:
-            await ctx.reply("I do not have permission to edit channels.")
-        except discord.HTTPException as e:
-            if "Contains words not allowed" in e.text:
-                name = self.bot.format_channel_name(ctx.recipient, force_null=True)
-                await ctx.channel.edit(name=name)
-            else:
-                await ctx.reply("Failed to reset the channel name. Try the rename command instead.")
-        else:
-            await ctx.reply(f"Channel renamed to `{name}`")
+        recipient = ctx.thread.recipient
+        await self._schedule_rename(
+            ctx,
+            self.format_channel_name(recipient, ctx.channel),
+            fallback=lambda: self.format_channel_name(recipient, ctx.channel, force_null=True),
+        )
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.MODERATOR)
+    async def resetnames(self, ctx):
+        """
+        Reset the channel names of all open threads back to their user's username.
+
+        The renames run in the background within Discord's rename limit.
+        """
+        scheduled = 0
+        latest = 0
+        for thread in list(self.bot.threads.cache.values()):
+            channel = thread.channel
+            if channel is None or thread.recipient is None:
+                continue
+            name = self.format_channel_name(thread.recipient, channel)
+            if channel.name == name:
+                continue
+            eta, future = self.scheduler.schedule(
+                channel,
+                name,
+                fallback=lambda recipient=thread.recipient, channel=channel: self.format_channel_name(
+                    recipient, channel, force_null=True
+                ),
+            )
+            future.add_done_callback(self._log_failure(channel.id))
+            scheduled += 1
+            latest = max(latest, eta)
+
+        if not scheduled:
+            return await ctx.reply("All thread channels already have their default name.")
+        timestamp = discord.utils.format_dt(discord.utils.utcnow() + timedelta(seconds=latest), "R")
+        await ctx.reply(f"Resetting the names of {scheduled} thread channels, done {timestamp}.")
 
 
 async def setup(bot):
@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+import csv
+import io
+import json
+from datetime import timedelta
+from typing import Iterator, Literal, Optional
+
+import discord
 from discord.ext import commands
 
 from core import checks
@@ -8,6 +15,13 @@ from core.models import PermissionLevel, getLogger
 logger = getLogger(__name__)
 
 
+class ExportFilters(commands.FlagConverter, delimiter=" ", prefix="--"):
+    category: Optional[discord.CategoryChannel] = None
+    older_than: Optional[int] = None
+    newer_than: Optional[int] = None
+    format: Literal["csv", "jsonl"] = "csv"
+
+
 class GetUserID(commands.Cog):
     """Simple Plugin with one command—get the user ID of the thread."""
 
@@ -18,11 +32,62 @@ class GetUserID(commands.Cog):
         """
         Get the user ID of the thread's recipient.
         """
-        recipients = ctx.thread.recipients
-        text = ""
-        for recipient in recipients:
-            text += f"{recipient.id} ({recipient.mention})\n"
-        await ctx.send(text.strip())
+        await ctx.send("\n".join(f"{recipient.id} ({recipient.mention})" for recipient in ctx.thread.recipients))
+
+    @staticmethod
+    def iter_threads(bot, filters: ExportFilters) -> Iterator[tuple]:
+        """Yields `(channel_id, recipient_ids, created_at)` of the cached open threads, without API calls."""
+        now = discord.utils.utcnow()
+        seen = set()
+        for thread in list(bot.threads.cache.values()):
+            channel = thread.channel
+            if channel is None or channel.id in seen:
+                continue
+            # Threads of several recipients are cached once per recipient
+            seen.add(channel.id)
+            if filters.category is not None and channel.category_id != filters.category.id:
+                continue
+            age = now - channel.created_at
+            if filters.older_than is not None and age < timedelta(days=filters.older_than):
+                continue
+            if filters.newer_than is not None and age > timedelta(days=filters.newer_than):
+                continue
+            yield channel.id, [recipient.id for recipient in thread.recipients], channel.created_at
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.SUPPORTER)
+    async def exportuserids(self, ctx, *, filters: ExportFilters):
+        """
+        Export the recipient IDs of every open thread as a CSV or JSONL file.
+
+        Filter with `--category`, `--older_than` and `--newer_than` (in days), choose the file with `--format`.
+        """
+        buffer = io.StringIO()
+        rows = 0
+        if filters.format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(("channel_id", "recipient_ids", "created_at"))
+            for channel_id, recipient_ids, created_at in self.iter_threads(ctx.bot, filters):
+                writer.writerow((channel_id, " ".join(map(str, recipient_ids)), created_at.isoformat()))
+                rows += 1
+        else:
+            for channel_id, recipient_ids, created_at in self.iter_threads(ctx.bot, filters):
+                buffer.write(
+                    json.dumps(
+                        {
+                            "channel_id": str(channel_id),
+                            "recipient_ids": [str(recipient_id) for recipient_id in recipient_ids],
+                            "created_at": created_at.isoformat(),
+                        }
+                    )
+                )
+                buffer.write("\n")
+                rows += 1
+
+        if not rows:
+            return await ctx.send("No open threads match the given filters.")
+        file = discord.File(io.BytesIO(buffer.getvalue().encode()), filename=f"recipients.{filters.format}")
+        await ctx.send(f"Exported {rows} threads.", file=file)
 
 
 async def setup(bot):
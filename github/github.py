@@ -1,7 +1,363 @@
+import asyncio
+import json
+import os
 import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
 import discord
 from discord.ext import commands
 
+from core import checks
+from core.models import PermissionLevel, getLogger
+
+logger = getLogger(__name__)
+
+GRAPHQL_FRAGMENT = """
+fragment reference on IssueOrPullRequest {
+  __typename
+  ... on Issue { number title body url state author { login avatarUrl url } labels(first: 20) { nodes { name } } }
+  ... on PullRequest {
+    number title body url state merged additions deletions commits { totalCount }
+    author { login avatarUrl url } labels(first: 20) { nodes { name } }
+  }
+}
+"""
+
+
+def fit_embeds(embeds: List[discord.Embed], limit: int = 6000) -> List[discord.Embed]:
+    """
+    Shortens the longest descriptions until the embeds fit in one message, Discord allows
+    6000 characters in total. A single message can be edited later, unlike split messages.
+    """
+    excess = sum(len(embed) for embed in embeds) - limit
+    if excess <= 0:
+        return embeds
+
+    lengths = sorted(len(embed.description or "") for embed in embeds)
+    budget = sum(lengths) - excess
+    cap = 0
+    if budget > 0:
+        # The largest length every description can be cut to within the budget
+        for i, length in enumerate(lengths):
+            share = budget // (len(lengths) - i)
+            if length > share:
+                cap = share
+                break
+            budget -= length
+    for embed in embeds:
+        description = embed.description or ""
+        if len(description) > cap:
+            embed.description = f"{description[: cap - 3]}..." if cap > 3 else None
+    return embeds
+
+
+class CacheEntry:
+    __slots__ = ("payload", "etag", "fetched_at")
+
+    def __init__(self, payload: dict, etag: Optional[str], fetched_at: float):
+        self.payload = payload
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+class ResponseCache:
+    """
+    In-memory LRU with a TTL in front of an on-disk SQLite store.
+
+    Entries past their TTL are kept so their ETag can be used to revalidate them,
+    a `304 Not Modified` to an authorized request does not count against the GitHub rate limit.
+    Rows not refreshed within `max_age` seconds are removed from the store.
+    """
+
+    # Stores between two prunes of the on-disk store
+    PRUNE_EVERY = 100
+
+    def __init__(self, path: str, maxsize: int = 256, ttl: float = 300, max_age: float = 7 * 24 * 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.path = path
+        # Opened on first use from the worker threads, loading the plugin does no disk I/O
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stores = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        with self._db_lock:
+            if self._db is None:
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(url TEXT PRIMARY KEY, etag TEXT, payload TEXT NOT NULL, fetched_at REAL NOT NULL)"
+                )
+                db.commit()
+                self._db = db
+                self._prune(db)
+            return self._db
+
+    def _prune(self, db: sqlite3.Connection) -> None:
+        db.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.max_age,))
+        db.commit()
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    async def get(self, url: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(url)
+        if entry is not None:
+            self._entries.move_to_end(url)
+            return entry
+        entry = await asyncio.to_thread(self._load, url)
+        if entry is not None:
+            self._remember(url, entry)
+        return entry
+
+    async def put(self, url: str, payload: dict, etag: Optional[str]) -> None:
+        entry = CacheEntry(payload, etag, time.time())
+        self._remember(url, entry)
+        await asyncio.to_thread(self._store, url, entry)
+
+    async def touch(self, url: str, entry: CacheEntry) -> None:
+        entry.fetched_at = time.time()
+        self._remember(url, entry)
+        await asyncio.to_thread(self._store, url, entry)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+
+    def _remember(self, url: str, entry: CacheEntry) -> None:
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _load(self, url: str) -> Optional[CacheEntry]:
+        row = self.db.execute(
+            "SELECT payload, etag, fetched_at FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(json.loads(row[0]), row[1], row[2])
+
+    def _store(self, url: str, entry: CacheEntry) -> None:
+        db = self.db
+        db.execute(
+            "INSERT OR REPLACE INTO responses (url, etag, payload, fetched_at) VALUES (?, ?, ?, ?)",
+            (url, entry.etag, json.dumps(entry.payload), entry.fetched_at),
+        )
+        db.commit()
+        self._stores += 1
+        if self._stores % self.PRUNE_EVERY == 0:
+            self._prune(db)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a lookup is shed to protect the remaining rate limit."""
+
+
+class RateLimitBucket:
+    __slots__ = ("limit", "remaining", "reset_at")
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0
+
+
+class RequestScheduler:
+    """
+    Funnels every GitHub request.
+
+    Identical concurrent lookups share a single in-flight request, and the
+    `X-RateLimit-*` headers are used to shed low priority lookups once the
+    remaining quota reaches the reserve, and to pause the others until the
+    quota resets.
+    """
+
+    HIGH = 0
+    LOW = 1
+
+    def __init__(self, reserve: int = 10, max_wait: float = 60):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.coalesced = 0
+        self.shed = 0
+        self.buckets: Dict[str, RateLimitBucket] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiting = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting + len(self._inflight)
+
+    def bucket(self, resource: str) -> RateLimitBucket:
+        if resource not in self.buckets:
+            self.buckets[resource] = RateLimitBucket()
+        return self.buckets[resource]
+
+    async def submit(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable],
+        *,
+        resource: str = "core",
+        priority: int = HIGH,
+    ):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._run(factory, resource, priority))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    def update(self, resource: str, headers) -> None:
+        """Updates the budget of a resource from the response headers."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        bucket = self.bucket(headers.get("X-RateLimit-Resource", resource))
+        bucket.remaining = int(remaining)
+        bucket.limit = int(headers.get("X-RateLimit-Limit", bucket.limit or 0))
+        bucket.reset_at = float(headers.get("X-RateLimit-Reset", bucket.reset_at))
+
+    async def _run(self, factory: Callable[[], Awaitable], resource: str, priority: int):
+        bucket = self.bucket(resource)
+        while bucket.remaining is not None and bucket.remaining <= self.reserve:
+            delay = bucket.reset_at - time.time()
+            if delay <= 0:
+                break
+            if priority == self.LOW or (bucket.remaining <= 0 and delay > self.max_wait):
+                self.shed += 1
+                raise RateLimitExceeded(f"GitHub {resource} rate limit resets in {delay:.0f}s.")
+            if bucket.remaining > 0:
+                # High priority lookups may use the reserve
+                break
+            self._waiting += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._waiting -= 1
+
+        if bucket.remaining is not None:
+            # Claim the request before it is sent, so concurrent requests don't overshoot
+            bucket.remaining -= 1
+        return await factory()
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Retrieve the exception so it isn't logged when nobody awaits it anymore
+            task.exception()
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and skips lookups for `cooldown` seconds.
+
+    Once the cooldown passed a single trial lookup is let through, which closes
+    the breaker again on success.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.skipped = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at < self.cooldown:
+            self.skipped += 1
+            return False
+        # Let one trial through and keep the others out for another cooldown
+        self.opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class LiveMessage:
+    __slots__ = ("channel_id", "message_id", "references", "fingerprints", "posted_at")
+
+    def __init__(
+        self,
+        channel_id: int,
+        message_id: int,
+        references: Tuple[Tuple[str, int], ...],
+        fingerprints: Tuple[tuple, ...],
+    ):
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.references = references
+        self.fingerprints = fingerprints
+        self.posted_at = time.monotonic()
+
+
+class LiveRegistry:
+    """
+    Posted reference messages whose embeds are kept up to date.
+
+    Bounded in size, the oldest messages are forgotten first, and messages past `max_age` are no longer refreshed.
+    """
+
+    def __init__(self, maxsize: int = 500, max_age: float = 7 * 24 * 3600):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._messages: "OrderedDict[int, LiveMessage]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add(self, message: LiveMessage) -> None:
+        self._messages[message.message_id] = message
+        while len(self._messages) > self.maxsize:
+            self._messages.popitem(last=False)
+
+    def remove(self, message_id: int) -> None:
+        self._messages.pop(message_id, None)
+
+    def active(self) -> List[LiveMessage]:
+        """Drops the messages past their age, the others are returned oldest first."""
+        now = time.monotonic()
+        while self._messages:
+            message = next(iter(self._messages.values()))
+            if now - message.posted_at < self.max_age:
+                break
+            self._messages.popitem(last=False)
+        return list(self._messages.values())
+
 
 class GithubPlugin(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -17,7 +373,129 @@ class GithubPlugin(commands.Cog):
                 "closed": None,  # Use None instead of discord.Embed.Empty
             },
         }
-        self.regex = r"(\S+)#(\d+)"  # Regex to match GitHub repo references
+        self.regex = re.compile(r"(\S+)#(\d+)")  # Regex to match GitHub repo references
+        self.cache = ResponseCache(
+            os.getenv(
+                "GITHUB_CACHE_PATH",
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), "github_cache.sqlite3"),
+            ),
+            maxsize=int(os.getenv("GITHUB_CACHE_SIZE", 256)),
+            ttl=float(os.getenv("GITHUB_CACHE_TTL", 300)),
+            max_age=float(os.getenv("GITHUB_CACHE_MAX_AGE", 7 * 24 * 3600)),
+        )
+        self.token = os.getenv("GITHUB_TOKEN")
+        # Discord allows at most 10 embeds per message
+        self.max_references = min(int(os.getenv("GITHUB_MAX_REFERENCES", 5)), 10)
+        self.breaker = CircuitBreaker(
+            threshold=int(os.getenv("GITHUB_BREAKER_THRESHOLD", 5)),
+            cooldown=float(os.getenv("GITHUB_BREAKER_COOLDOWN", 60)),
+        )
+        self.semaphore = asyncio.Semaphore(int(os.getenv("GITHUB_MAX_CONCURRENCY", 4)))
+        self.max_pending = int(os.getenv("GITHUB_MAX_PENDING", 20))
+        self.pending = 0
+        self.dropped = 0
+        # Budget for resolving all references of a message, and for a single request
+        self.timeout = float(os.getenv("GITHUB_TIMEOUT", 10))
+        self.request_timeout = aiohttp.ClientTimeout(total=float(os.getenv("GITHUB_REQUEST_TIMEOUT", 5)))
+        # A lookup only waits for the quota to reset when the request still fits in the budget afterwards,
+        # otherwise it is shed, a timeout would count as a GitHub failure towards the circuit breaker
+        self.scheduler = RequestScheduler(
+            reserve=int(os.getenv("GITHUB_RATELIMIT_RESERVE", 10)),
+            max_wait=min(
+                float(os.getenv("GITHUB_RATELIMIT_MAX_WAIT", 60)),
+                max(self.timeout - self.request_timeout.total, 0),
+            ),
+        )
+
+        # Embeds of open issues and pull requests are refreshed, 0 disables it. Off by default
+        # without a token, the refreshes would use up the unauthenticated 60 requests an hour
+        self.live_interval = float(os.getenv("GITHUB_LIVE_INTERVAL", 300 if self.token else 0))
+        self.live_batch_size = int(os.getenv("GITHUB_LIVE_BATCH_SIZE", 20))
+        self.live = LiveRegistry(
+            maxsize=int(os.getenv("GITHUB_LIVE_MAX_MESSAGES", 500)),
+            max_age=float(os.getenv("GITHUB_LIVE_MAX_AGE", 7 * 24 * 3600)),
+        )
+        self.live_edits = 0
+        self._live_task: Optional[asyncio.Task] = None
+
+    def _headers(self) -> dict:
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    async def cog_load(self):
+        if self.live_interval > 0:
+            self._live_task = self.bot.loop.create_task(self.live_refresh_loop())
+
+    async def cog_unload(self):
+        if self._live_task is not None:
+            self._live_task.cancel()
+        self.cache.close()
+
+    async def fetch_json(self, url: str, priority: int = RequestScheduler.HIGH) -> dict:
+        """
+        Fetches a GitHub API url, serving fresh entries from the cache and
+        revalidating stale ones with their ETag.
+
+        Raises `RateLimitExceeded` when the lookup is shed by the scheduler.
+        """
+        entry = await self.cache.get(url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.hits += 1
+            return entry.payload
+
+        return await self.scheduler.submit(url, lambda: self._request(url, entry), priority=priority)
+
+    async def _request(self, url: str, entry: Optional[CacheEntry]) -> dict:
+        headers = self._headers()
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+
+        async with self.bot.session.get(url, headers=headers, timeout=self.request_timeout) as response:
+            self.scheduler.update("core", response.headers)
+            if response.status == 304 and entry is not None:
+                self.cache.revalidations += 1
+                await self.cache.touch(url, entry)
+                return entry.payload
+
+            self.cache.misses += 1
+            data = await response.json()
+            # 404s are cached too, so unknown references don't cost a request each time
+            if response.status in (200, 404):
+                await self.cache.put(url, data, response.headers.get("ETag"))
+            return data
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.SUPPORTER)
+    async def githubstats(self, ctx):
+        """
+        Shows statistics of the GitHub reference lookups.
+        """
+        embed = discord.Embed(title="GitHub Lookups", color=self.bot.main_color)
+        embed.add_field(name="Cache Hits", value=self.cache.hits, inline=True)
+        embed.add_field(name="Cache Misses", value=self.cache.misses, inline=True)
+        embed.add_field(name="Revalidations", value=self.cache.revalidations, inline=True)
+        embed.add_field(name="Coalesced", value=self.scheduler.coalesced, inline=True)
+        embed.add_field(name="Shed", value=self.scheduler.shed, inline=True)
+        embed.add_field(name="Queue Depth", value=self.scheduler.queue_depth, inline=True)
+        embed.add_field(name="Pending Messages", value=self.pending, inline=True)
+        embed.add_field(name="Dropped Messages", value=self.dropped, inline=True)
+        embed.add_field(name="Live Messages", value=f"{len(self.live)} ({self.live_edits} edits)", inline=True)
+        embed.add_field(
+            name="Circuit Breaker",
+            value=f"{self.breaker.state} ({self.breaker.skipped} skipped)",
+            inline=True,
+        )
+        for resource, bucket in self.scheduler.buckets.items():
+            if bucket.remaining is None:
+                continue
+            embed.add_field(
+                name=f"Budget ({resource})",
+                value=f"{bucket.remaining}/{bucket.limit}, resets <t:{int(bucket.reset_at)}:R>",
+                inline=False,
+            )
+        await ctx.send(embed=embed)
 
     @commands.Cog.listener()
     async def on_message(self, msg: discord.Message):
@@ -25,37 +503,300 @@ class GithubPlugin(commands.Cog):
         if msg.author.bot:
             return
 
-        match = re.search(self.regex, msg.content)
-        if not match:
+        # Cheap pre-filter, most messages can't contain a reference
+        if "#" not in msg.content:
+            return
+
+        references = []
+        for match in self.regex.finditer(msg.content):
+            repo = self._full_repo(match.group(1))
+            # Only owner/name references, channel mentions like <#123> would otherwise hit the API
+            if repo.count("/") != 1 or not all(repo.split("/")):
+                continue
+            reference = (repo, int(match.group(2)))
+            if reference not in references:
+                references.append(reference)
+            if len(references) >= self.max_references:
+                break
+        if not references:
+            return
+
+        if not self.breaker.allow():
+            return
+        if self.pending >= self.max_pending:
+            self.dropped += 1
+            return
+
+        self.pending += 1
+        try:
+            async with self.semaphore:
+                results = await asyncio.wait_for(self.resolve(references), self.timeout)
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            self.breaker.record_failure()
+            logger.warning("Failed to look up GitHub references: %s", str(e) or type(e).__name__)
+            return
+        finally:
+            self.pending -= 1
+        self.breaker.record_success()
+
+        resolved = [(reference, result) for reference, result in zip(references, results) if result is not None]
+        if not resolved:
+            return
+        try:
+            message = await msg.channel.send(embeds=await self.build_embeds(resolved))
+        except discord.HTTPException as e:
+            logger.warning("Failed to send the GitHub embeds: %s", e)
             return
 
-        repo, num = match.groups()
+        if self.live_interval > 0 and any(self._is_open(data) for _, (data, _) in resolved):
+            self.live.add(
+                LiveMessage(
+                    message.channel.id,
+                    message.id,
+                    tuple(reference for reference, _ in resolved),
+                    tuple(self._fingerprint(data) for _, (data, _) in resolved),
+                )
+            )
 
+    async def build_embeds(self, resolved: List[Tuple[Tuple[str, int], Tuple[dict, bool]]]) -> List[discord.Embed]:
+        embeds = []
+        for (repo, _), (data, is_pr) in resolved:
+            if is_pr:
+                embeds.append(await self.handle_pr(data, repo))
+            else:
+                embeds.append(await self.handle_issue(data, repo))
+        return fit_embeds(embeds)
+
+    @staticmethod
+    def _is_open(data: dict) -> bool:
+        return data["state"] == "open"
+
+    @staticmethod
+    def _fingerprint(data: dict) -> tuple:
+        """What a refresh compares, the embed is only edited when one of these changed."""
+        return (
+            data["state"],
+            data.get("merged"),
+            data["title"],
+            tuple(label["name"] for label in data.get("labels") or ()),
+            data.get("additions"),
+            data.get("deletions"),
+            data.get("commits"),
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        self.live.remove(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            self.live.remove(message_id)
+
+    async def live_refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.live_interval)
+            try:
+                await self.refresh_live_messages()
+            except Exception:
+                logger.error("Failed to refresh the posted GitHub embeds.", exc_info=True)
+
+    async def refresh_live_messages(self) -> int:
+        """
+        Looks up every reference of the live messages in batches, one GraphQL query
+        or conditional REST requests per batch, and edits the messages that changed.
+
+        Returns the number of edited messages.
+        """
+        messages = self.live.active()
+        if not messages or not self.breaker.allow():
+            return 0
+
+        references = list(dict.fromkeys(reference for message in messages for reference in message.references))
+        resolved: Dict[Tuple[str, int], Optional[Tuple[dict, bool]]] = {}
+        for i in range(0, len(references), self.live_batch_size):
+            batch = references[i : i + self.live_batch_size]
+            try:
+                results = await asyncio.wait_for(self.resolve(batch, RequestScheduler.LOW), self.timeout)
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                self.breaker.record_failure()
+                logger.warning("Failed to refresh GitHub references: %s", str(e) or type(e).__name__)
+                break
+            self.breaker.record_success()
+            resolved.update(zip(batch, results))
+
+        edited = 0
+        for message in messages:
+            results = [resolved.get(reference) for reference in message.references]
+            # Shed or failed lookups are retried on the next refresh
+            if any(result is None for result in results):
+                continue
+            fingerprints = tuple(self._fingerprint(data) for data, _ in results)
+            if fingerprints == message.fingerprints:
+                continue
+
+            channel = self.bot.get_channel(message.channel_id)
+            if channel is None:
+                self.live.remove(message.message_id)
+                continue
+            embeds = await self.build_embeds(list(zip(message.references, results)))
+            try:
+                await channel.get_partial_message(message.message_id).edit(embeds=embeds)
+            except (discord.NotFound, discord.Forbidden):
+                self.live.remove(message.message_id)
+                continue
+            except discord.HTTPException as e:
+                logger.warning("Failed to edit GitHub embeds of message %s: %s", message.message_id, e)
+                continue
+
+            edited += 1
+            message.fingerprints = fingerprints
+            if not any(self._is_open(data) for data, _ in results):
+                self.live.remove(message.message_id)
+        self.live_edits += edited
+        return edited
+
+    async def resolve(
+        self, references: List[Tuple[str, int]], priority: int = RequestScheduler.HIGH
+    ) -> List[Optional[Tuple[dict, bool]]]:
+        if self.token:
+            return await self.resolve_graphql(references, priority)
+
+        # Only the first reference of a message is looked up when the quota runs low
+        return await asyncio.gather(
+            *(
+                self.resolve_rest(repo, num, priority if i == 0 else RequestScheduler.LOW)
+                for i, (repo, num) in enumerate(references)
+            )
+        )
+
+    @staticmethod
+    def _full_repo(repo: str) -> str:
         # Map short repo names to full repo paths
         if repo == "modmail":
-            repo = "modmail-dev/modmail"
-        elif repo == "logviewer":
-            repo = "modmail-dev/logviewer"
-
-        # Try fetching the pull request (PR) or issue data
-        async with self.bot.session.get(
-            f"https://api.github.com/repos/{repo}/pulls/{num}"
-        ) as pr_response:
-            pr_data = await pr_response.json()
-
-            if "message" not in pr_data:
-                embed = await self.handle_pr(pr_data, repo)
-                await msg.channel.send(embed=embed)
-                return
-
-        async with self.bot.session.get(
-            f"https://api.github.com/repos/{repo}/issues/{num}"
-        ) as issue_response:
-            issue_data = await issue_response.json()
-
-            if "message" not in issue_data:
-                embed = await self.handle_issue(issue_data, repo)
-                await msg.channel.send(embed=embed)
+            return "modmail-dev/modmail"
+        if repo == "logviewer":
+            return "modmail-dev/logviewer"
+        return repo
+
+    async def resolve_rest(
+        self, repo: str, num: int, priority: int = RequestScheduler.HIGH
+    ) -> Optional[Tuple[dict, bool]]:
+        """
+        Resolves a reference through the REST API.
+
+        `/issues/{num}` covers both issues and pull requests, only pull requests
+        need a second request for their diff statistics.
+        """
+        try:
+            data = await self.fetch_json(f"https://api.github.com/repos/{repo}/issues/{num}", priority)
+            if "message" in data:
+                return None
+            if "pull_request" not in data:
+                return data, False
+
+            pr_data = await self.fetch_json(f"https://api.github.com/repos/{repo}/pulls/{num}", priority)
+        except RateLimitExceeded as e:
+            logger.debug("Skipped %s#%s: %s", repo, num, e)
+            return None
+        if "message" in pr_data:
+            return None
+        return pr_data, True
+
+    async def resolve_graphql(
+        self, references: List[Tuple[str, int]], priority: int = RequestScheduler.HIGH
+    ) -> List[Optional[Tuple[dict, bool]]]:
+        """
+        Resolves all references with a single GraphQL query, requires `GITHUB_TOKEN`.
+
+        Results are converted into the shape of the REST API payloads.
+        """
+        results: List[Optional[Tuple[dict, bool]]] = [None] * len(references)
+        missing = []
+        for i, (repo, num) in enumerate(references):
+            entry = await self.cache.get(f"graphql:{repo}#{num}")
+            if entry is not None and self.cache.is_fresh(entry):
+                self.cache.hits += 1
+                results[i] = entry.payload["data"], entry.payload["is_pr"]
+            elif "/" in repo:
+                missing.append(i)
+        if not missing:
+            return results
+
+        declarations = []
+        selections = []
+        variables = {}
+        for i in missing:
+            repo, num = references[i]
+            owner, name = repo.split("/", 1)
+            declarations.append(f"$owner{i}: String!, $name{i}: String!, $number{i}: Int!")
+            selections.append(
+                f"r{i}: repository(owner: $owner{i}, name: $name{i}) "
+                f"{{ issueOrPullRequest(number: $number{i}) {{ ...reference }} }}"
+            )
+            variables.update({f"owner{i}": owner, f"name{i}": name, f"number{i}": num})
+        query = f"query({', '.join(declarations)}) {{ {' '.join(selections)} }}{GRAPHQL_FRAGMENT}"
+
+        self.cache.misses += len(missing)
+        body = {"query": query, "variables": variables}
+        try:
+            payload = await self.scheduler.submit(
+                json.dumps(body, sort_keys=True),
+                lambda: self._post_graphql(body),
+                resource="graphql",
+                priority=priority,
+            )
+        except RateLimitExceeded as e:
+            logger.debug("Skipped GraphQL lookup: %s", e)
+            return results
+
+        data = payload.get("data") or {}
+        for i in missing:
+            node = (data.get(f"r{i}") or {}).get("issueOrPullRequest")
+            if node is None:
+                continue
+            repo, num = references[i]
+            results[i] = self._from_graphql(node)
+            await self.cache.put(
+                f"graphql:{repo}#{num}", {"data": results[i][0], "is_pr": results[i][1]}, None
+            )
+        return results
+
+    async def _post_graphql(self, body: dict) -> dict:
+        async with self.bot.session.post(
+            "https://api.github.com/graphql",
+            json=body,
+            headers=self._headers(),
+            timeout=self.request_timeout,
+        ) as response:
+            self.scheduler.update("graphql", response.headers)
+            return await response.json()
+
+    @staticmethod
+    def _from_graphql(node: dict) -> Tuple[dict, bool]:
+        author = node.get("author") or {
+            "login": "ghost",
+            "avatarUrl": "https://avatars.githubusercontent.com/u/10137?v=4",
+            "url": "https://github.com/ghost",
+        }
+        is_pr = node["__typename"] == "PullRequest"
+        data = {
+            "number": node["number"],
+            "title": node["title"],
+            "body": node["body"],
+            "html_url": node["url"],
+            "state": "closed" if node["state"] == "MERGED" else node["state"].lower(),
+            "user": {"login": author["login"], "avatar_url": author["avatarUrl"], "html_url": author["url"]},
+            "labels": [{"name": label["name"]} for label in node["labels"]["nodes"]],
+        }
+        if is_pr:
+            data.update(
+                merged=node["merged"],
+                additions=node["additions"],
+                deletions=node["deletions"],
+                commits=node["commits"]["totalCount"],
+            )
+        return data, is_pr
 
     async def handle_pr(self, data: dict, repo: str) -> discord.Embed:
         # Determine the state of the PR
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+from typing import Dict, List, Union
+
 import discord
 from discord.ext import commands
 
@@ -13,27 +16,123 @@ logger = getLogger(__name__)
 class GiveRole(commands.Cog):
     """A plugin that gives the thread recipient a role."""
 
+    # Role edits share a per-guild rate limit bucket, discord.py waits out 429s on its own
+    CONCURRENCY = 5
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def resolve_members(self, guild: discord.Guild, user_ids: List[int]) -> Dict[int, discord.Member]:
+        """
+        Resolves members from the cache, missing ones are requested in bulk through
+        gateway member chunking with a `fetch_member` fallback.
+        """
+        members = {}
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member is not None:
+                members[user_id] = member
+            else:
+                missing.append(user_id)
+
+        unchunked = []
+        for i in range(0, len(missing), 100):
+            try:
+                chunk = await guild.query_members(user_ids=missing[i : i + 100], limit=100, cache=True)
+            except (discord.ClientException, asyncio.TimeoutError) as e:
+                logger.debug("Member chunking failed, fetching members instead: %s", e)
+                unchunked = missing[i:]
+                break
+            members.update((member.id, member) for member in chunk)
+
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+
+        async def fetch(user_id: int):
+            async with semaphore:
+                try:
+                    members[user_id] = await guild.fetch_member(user_id)
+                except discord.NotFound:
+                    pass
+
+        await asyncio.gather(*(fetch(user_id) for user_id in unchunked))
+        return members
+
     @commands.command()
     @checks.has_permissions(PermissionLevel.ADMINISTRATOR)
     @checks.thread_only()
     async def giverole(self, ctx, *, role: discord.Role):
         """
-        Gives the thread recipient a role. DANGEROUS COMMAND: see description.
+        Gives the thread recipients a role. DANGEROUS COMMAND: see description.
+
+        Use `{prefix}giveroles` to give a role to the recipients of several threads or to users.
 
         This command is dangerous because it does not check for permissions.
         Anyone who can use this command can give themselves, or anyone else, any role.
         """
-        recipients = ctx.thread.recipients
-        try:
-            for recipient in recipients:
-                await ctx.guild.get_member(recipient.id).\
-                    add_roles(role, reason=f"Role given by {ctx.author} in Modmail thread.")
-        except Exception as e:
-            await ctx.send(f"Error giving role: {e}")
-            return
-        await ctx.send(f"{role.mention} given to {human_join([r.mention for r in recipients])}.",
+        await self.give_role(ctx, role, list(ctx.thread.recipients))
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.ADMINISTRATOR)
+    async def giveroles(self, ctx, role: discord.Role, *targets: Union[discord.TextChannel, discord.User]):
+        """
+        Gives a role to the recipients of several threads and/or to users. DANGEROUS COMMAND: see description.
+
+        Give the role first, put role names with spaces in quotes, followed by thread channels and/or users.
+
+        This command is dangerous because it does not check for permissions.
+        Anyone who can use this command can give themselves, or anyone else, any role.
+        """
+        if not targets:
+            return await ctx.send("Give the thread channels or users to give the role to.")
+        recipients = []
+        for target in targets:
+            if isinstance(target, discord.TextChannel):
+                thread = await self.bot.threads.find(channel=target)
+                if thread is None:
+                    return await ctx.send(f"{target.mention} is not a thread.")
+                recipients.extend(thread.recipients)
+            else:
+                recipients.append(target)
+        await self.give_role(ctx, role, recipients)
+
+    async def give_role(self, ctx, role: discord.Role, recipients: list) -> None:
+        user_ids = list(dict.fromkeys(recipient.id for recipient in recipients))
+
+        members = await self.resolve_members(ctx.guild, user_ids)
+        given = []
+        skipped = []
+        failed = []
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+
+        async def give(user_id: int):
+            member = members.get(user_id)
+            if member is None:
+                failed.append(f"<@{user_id}>: not in this server")
+                return
+            if role in member.roles:
+                skipped.append(member.mention)
+                return
+            async with semaphore:
+                try:
+                    await member.add_roles(role, reason=f"Role given by {ctx.author} in Modmail thread.")
+                except discord.HTTPException as e:
+                    failed.append(f"{member.mention}: {e.text or e.status}")
+                else:
+                    given.append(member.mention)
+
+        await asyncio.gather(*(give(user_id) for user_id in user_ids))
+
+        lines = []
+        if given:
+            lines.append(f"{role.mention} given to {human_join(given)}.")
+        if skipped:
+            lines.append(f"{human_join(skipped)} already had {role.mention}.")
+        if failed:
+            lines.append("Error giving role:\n" + "\n".join(f"- {failure}" for failure in failed))
+        await ctx.send("\n".join(lines)[:2000],
                        allowed_mentions=discord.AllowedMentions(roles=False, users=False))
 
 
 async def setup(bot):
-    await bot.add_cog(GiveRole())
+    await bot.add_cog(GiveRole(bot))
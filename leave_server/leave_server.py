@@ -1,5 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import re
+import time
+from bisect import bisect_left, insort
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
 import discord
 from discord.ext import commands
 
@@ -9,26 +17,301 @@ from core.models import PermissionLevel, getLogger
 logger = getLogger(__name__)
 
 
+class GuildEntry:
+    # Only the ID is kept, discord.py replaces the Guild objects after a reconnect
+    __slots__ = ("id", "name", "key", "label")
+
+    def __init__(self, guild: discord.Guild):
+        self.id = guild.id
+        self.name = guild.name
+        self.key = guild.name.casefold()
+        # Escaped once, instead of on every listing
+        self.label = discord.utils.escape_markdown(discord.utils.escape_mentions(f"{guild} ({guild.id})"))
+
+
+class GuildIndex:
+    """
+    Name index of the guilds the bot is in, kept up to date by the guild events.
+
+    Guilds are resolved through `get_guild` when filtered, entries of guilds the bot left are skipped.
+    """
+
+    def __init__(self, guilds, get_guild: Callable[[int], Optional[discord.Guild]]):
+        self.get_guild = get_guild
+        self._entries: Dict[int, GuildEntry] = {}
+        self._names: List[Tuple[str, int]] = []
+        for guild in guilds:
+            self._entries[guild.id] = GuildEntry(guild)
+        self._names = sorted((entry.key, guild_id) for guild_id, entry in self._entries.items())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, guild: discord.Guild) -> None:
+        self.remove(guild.id)
+        entry = self._entries[guild.id] = GuildEntry(guild)
+        insort(self._names, (entry.key, guild.id))
+
+    def remove(self, guild_id: int) -> None:
+        entry = self._entries.pop(guild_id, None)
+        if entry is not None:
+            self._names.pop(bisect_left(self._names, (entry.key, guild_id)))
+
+    def get(self, guild_id: int) -> Optional[GuildEntry]:
+        return self._entries.get(guild_id)
+
+    def find(self, name: str) -> List[GuildEntry]:
+        """Returns the guilds with the given name, ignoring case."""
+        key = name.casefold()
+        entries = []
+        for entry_key, guild_id in self._names[bisect_left(self._names, (key, 0)) :]:
+            if entry_key != key:
+                break
+            entries.append(self._entries[guild_id])
+        return entries
+
+    def search(
+        self,
+        prefix: Optional[str] = None,
+        contains: Optional[str] = None,
+        min_members: Optional[int] = None,
+        max_members: Optional[int] = None,
+        joined_within: Optional[int] = None,
+        joined_before: Optional[int] = None,
+    ) -> List[GuildEntry]:
+        """Returns the matching guilds sorted by name, the join filters are in days."""
+        if prefix:
+            prefix = prefix.casefold()
+            candidates = []
+            for key, guild_id in self._names[bisect_left(self._names, (prefix, 0)) :]:
+                if not key.startswith(prefix):
+                    break
+                candidates.append(self._entries[guild_id])
+        else:
+            candidates = [self._entries[guild_id] for _, guild_id in self._names]
+
+        now = discord.utils.utcnow()
+        contains = contains.casefold() if contains else None
+        results = []
+        for entry in candidates:
+            if contains and contains not in entry.key:
+                continue
+            guild = self.get_guild(entry.id)
+            if guild is None:
+                continue
+            member_count = guild.member_count or 0
+            if min_members is not None and member_count < min_members:
+                continue
+            if max_members is not None and member_count > max_members:
+                continue
+            if joined_within is not None or joined_before is not None:
+                joined_at = guild.me.joined_at if guild.me else None
+                if joined_at is None:
+                    continue
+                if joined_within is not None and joined_at < now - timedelta(days=joined_within):
+                    continue
+                if joined_before is not None and joined_at > now - timedelta(days=joined_before):
+                    continue
+            results.append(entry)
+        return results
+
+
+class GuildFilters(commands.FlagConverter, delimiter=" ", prefix="--"):
+    prefix: Optional[str] = None
+    name: Optional[str] = None
+    min_members: Optional[int] = None
+    max_members: Optional[int] = None
+    joined_within: Optional[int] = None
+    joined_before: Optional[int] = None
+
+
+class LeaveFilters(commands.FlagConverter, delimiter=" ", prefix="--"):
+    ids: Optional[str] = None
+    below_members: Optional[int] = None
+    missing_role: Optional[str] = None
+    missing_channel: Optional[str] = None
+    confirm: bool = False
+
+
+class GuildPages(discord.ui.View):
+    """Paginates guild entries, rendering each page only when it is shown."""
+
+    PER_PAGE = 20
+
+    def __init__(self, author_id: int, entries: List[GuildEntry], color):
+        super().__init__(timeout=180)
+        self.author_id = author_id
+        self.entries = entries
+        self.color = color
+        self.page = 0
+        self.pages = max(1, -(-len(entries) // self.PER_PAGE))
+        self._update_buttons()
+
+    def render(self) -> discord.Embed:
+        start = self.page * self.PER_PAGE
+        lines = [
+            f"{i}. {entry.label}"
+            for i, entry in enumerate(self.entries[start : start + self.PER_PAGE], start=start + 1)
+        ]
+        embed = discord.Embed(
+            title=f"Servers ({len(self.entries)})",
+            description="\n".join(lines) or "No servers found.",
+            color=self.color,
+        )
+        embed.set_footer(text=f"Page {self.page + 1}/{self.pages}")
+        return embed
+
+    def _update_buttons(self) -> None:
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author_id
+
+    async def _show(self, interaction: discord.Interaction, page: int) -> None:
+        self.page = page
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
+
+
 class LeaveServer(commands.Cog):
     """A plugin that makes the bot leave a server."""
 
+    # Past this many results the list is sent as a file
+    FILE_THRESHOLD = 500
+    # Concurrent leaves, discord.py waits out the rate limit buckets on its own
+    LEAVE_CONCURRENCY = 3
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._index: Optional[GuildIndex] = None
+
+    @property
+    def index(self) -> GuildIndex:
+        if self._index is None:
+            self._index = GuildIndex(self.bot.guilds, self.bot.get_guild)
+        return self._index
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Guilds left while disconnected never fire on_guild_remove, rebuild on the next use
+        self._index = None
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: discord.Guild):
+        if self._index is not None:
+            self._index.add(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        if self._index is not None:
+            self._index.add(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        if self._index is not None:
+            self._index.remove(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if self._index is not None and before.name != after.name:
+            self._index.add(after)
 
     @commands.command()
     @checks.has_permissions(PermissionLevel.OWNER)
-    async def findallservers(self, ctx):
+    async def findallservers(self, ctx, *, filters: GuildFilters):
         """
         This command shows you all the servers and their IDs that your bot is in.
+
+        Filter with `--prefix`, `--name` (substring), `--min_members`, `--max_members`,
+        `--joined_within` and `--joined_before` (in days).
         """
-        await ctx.reply(discord.utils.escape_markdown(discord.utils.escape_mentions(
-            "\n".join([f"{i}. {s} ({s.id})" for i, s in enumerate(ctx.bot.guilds, start=1)])
-        )))
+        entries = self.index.search(
+            prefix=filters.prefix,
+            contains=filters.name,
+            min_members=filters.min_members,
+            max_members=filters.max_members,
+            joined_within=filters.joined_within,
+            joined_before=filters.joined_before,
+        )
+
+        if len(entries) > self.FILE_THRESHOLD:
+            buffer = io.StringIO()
+            for i, entry in enumerate(entries, start=1):
+                buffer.write(f"{i}. {entry.name} ({entry.id})\n")
+            file = discord.File(io.BytesIO(buffer.getvalue().encode()), filename="servers.txt")
+            return await ctx.reply(f"Found {len(entries)} servers.", file=file)
+
+        view = GuildPages(ctx.author.id, entries, self.bot.main_color)
+        await ctx.reply(embed=view.render(), view=view if view.pages > 1 else None)
+
+    def resolve_guilds(self, argument: str) -> List[discord.Guild]:
+        """Resolves a guild by ID, or the guilds whose name is exactly the argument, case included."""
+        if argument.isdigit():
+            entry = self.index.get(int(argument))
+            if entry is not None:
+                guild = self.bot.get_guild(entry.id)
+                return [guild] if guild is not None else []
+        guilds = []
+        for entry in self.index.find(argument):
+            guild = self.bot.get_guild(entry.id)
+            if guild is not None and guild.name == argument:
+                guilds.append(guild)
+        return guilds
+
+    def select_guilds(self, filters: LeaveFilters) -> List[GuildEntry]:
+        """Returns the guilds matching every given criterion, the Modmail guilds are never selected."""
+        if filters.ids:
+            entries = [self.index.get(int(guild_id)) for guild_id in re.findall(r"\d+", filters.ids)]
+            entries = [entry for entry in entries if entry is not None]
+        else:
+            entries = self.index.search()
+
+        modmail_guild = self.bot.modmail_guild
+        protected = {self.bot.guild_id, modmail_guild.id if modmail_guild is not None else None}
+        selected = []
+        for entry in entries:
+            guild = self.bot.get_guild(entry.id)
+            if guild is None or guild.id in protected:
+                continue
+            if filters.below_members is not None and (guild.member_count or 0) >= filters.below_members:
+                continue
+            if filters.missing_role is not None and discord.utils.find(
+                lambda r: r.name == filters.missing_role or str(r.id) == filters.missing_role, guild.roles
+            ):
+                continue
+            if filters.missing_channel is not None and discord.utils.find(
+                lambda c: c.name == filters.missing_channel or str(c.id) == filters.missing_channel, guild.channels
+            ):
+                continue
+            selected.append(entry)
+        return selected
 
     @commands.command()
     @checks.has_permissions(PermissionLevel.OWNER)
-    async def leaveserver(self, ctx, *, guild: discord.Guild):
+    async def leaveserver(self, ctx, *, guild: str):
         """
         Leaves the specified server. Use `{prefix}findallservers` to find all the servers your bot is in.
         """
+        resolved = self.resolve_guilds(guild)
+        if not resolved:
+            return await ctx.reply(
+                f"Server `{discord.utils.escape_markdown(discord.utils.escape_mentions(guild))}` not found."
+            )
+        if len(resolved) > 1:
+            # Leaving can't be undone, don't pick one of several servers with the same name
+            ids = ", ".join(f"`{candidate.id}`" for candidate in resolved)
+            return await ctx.reply(f"{len(resolved)} servers have this name, leave one by its ID: {ids}")
+        guild = resolved[0]
+
         name = discord.utils.escape_markdown(discord.utils.escape_mentions(str(guild)))
         try:
             await guild.leave()
@@ -37,6 +320,64 @@ class LeaveServer(commands.Cog):
         else:
             await ctx.reply(f"Successfully left {name}.")
 
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.OWNER)
+    async def leaveservers(self, ctx, *, filters: LeaveFilters):
+        """
+        Leaves every server matching the given criteria.
+
+        Select with `--ids` (space or comma separated), `--below_members`, `--missing_role`
+        and `--missing_channel` (name or ID), all given criteria have to match.
+        Only a preview is shown unless `--confirm true` is given.
+        """
+        if not any((filters.ids, filters.below_members is not None, filters.missing_role, filters.missing_channel)):
+            return await ctx.reply(
+                "Give at least one of `--ids`, `--below_members`, `--missing_role` or `--missing_channel`."
+            )
+
+        entries = self.select_guilds(filters)
+        if not entries:
+            return await ctx.reply("No servers match the given criteria.")
+
+        if not filters.confirm:
+            view = GuildPages(ctx.author.id, entries, self.bot.main_color)
+            return await ctx.reply(
+                f"Dry run: {len(entries)} servers would be left. Run again with `--confirm true` to leave them.",
+                embed=view.render(),
+                view=view if view.pages > 1 else None,
+            )
+
+        status = await ctx.reply(f"Leaving {len(entries)} servers...")
+        semaphore = asyncio.Semaphore(self.LEAVE_CONCURRENCY)
+        left = 0
+        failures: List[str] = []
+        last_update = time.monotonic()
+
+        async def leave(entry: GuildEntry):
+            nonlocal left, last_update
+            guild = self.bot.get_guild(entry.id)
+            if guild is None:
+                # Left in the meantime
+                left += 1
+                return
+            async with semaphore:
+                try:
+                    await guild.leave()
+                except discord.HTTPException as e:
+                    failures.append(f"{entry.label}: {e.text or e.status}")
+                else:
+                    left += 1
+            if time.monotonic() - last_update >= 5:
+                last_update = time.monotonic()
+                await status.edit(content=f"Leaving servers... {left + len(failures)}/{len(entries)}")
+
+        await asyncio.gather(*(leave(entry) for entry in entries))
+
+        report = f"Left {left}/{len(entries)} servers."
+        if failures:
+            report += f"\nFailed to leave {len(failures)}:\n" + "\n".join(failures)
+        await status.edit(content=report[:2000])
+
 
 async def setup(bot):
-    await bot.add_cog(LeaveServer())
+    await bot.add_cog(LeaveServer(bot))
@@ -1,77 +1,643 @@
+import asyncio
+import bisect
+import functools
 import os
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
 
+import aiohttp
 import discord
 from discord.ext import commands
 from discord.utils import utcnow, format_dt
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo.errors import ServerSelectionTimeoutError, InvalidURI
 
+from core import checks
+from core.models import PermissionLevel
+from core.paginator import EmbedPaginatorSession
 from core.utils import getLogger
 
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
 LOGGER = getLogger(__name__)
 
+# Only what the thread embed shows, mongo_uri should never be requested and stored in memory
+INSTANCE_PROJECTION = {"_id": 0, "owner": 1, "name": 1, "created_at": 1}
+INSTANCE_BATCH_SIZE = 50
+
+
+class PoolMetrics:
+    """
+    Counts connection checkouts of the management db client.
+
+    Registered with pymongo through `pool_listener_type`, so pymongo is only imported once a client is created.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checked_in = 0
+        self.created = 0
+        self.closed = 0
+        self.pool_clears = 0
+
+    @property
+    def in_use(self) -> int:
+        return self.checkouts - self.checked_in
+
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        self.checked_in += 1
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def connection_closed(self, event):
+        self.closed += 1
+
+    def pool_cleared(self, event):
+        self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def pool_listener_type() -> type:
+    from pymongo import monitoring
+
+    return type("PoolMetricsListener", (PoolMetrics, monitoring.ConnectionPoolListener), {})
+
+
+def group_embeds(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """Groups embeds into messages, Discord allows at most 10 embeds and 6000 characters per message."""
+    groups: List[List[discord.Embed]] = []
+    size = 0
+    for embed in embeds:
+        if not groups or len(groups[-1]) >= 10 or size + len(embed) > 6000:
+            groups.append([])
+            size = 0
+        groups[-1].append(embed)
+        size += len(embed)
+    return groups
+
+
+class InstanceCache:
+    """
+    Owner to active instances cache with a TTL.
+
+    Empty results are cached as well, most users don't host any logviewer.
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, list]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def owners(self) -> List[str]:
+        return list(self._entries)
+
+    def get(self, owner: str) -> Optional[list]:
+        entry = self._entries.get(owner)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, owner: str, instances: list) -> None:
+        # Re-inserted, so the entries stay ordered by age and pruning stops at the first fresh one
+        self._entries.pop(owner, None)
+        self._entries[owner] = (time.monotonic(), instances)
+        self.prune()
+
+    def update(self, owner: str, instances: list) -> None:
+        """Replaces the instances of a cached owner without extending its TTL."""
+        if owner in self._entries:
+            self._entries[owner] = (self._entries[owner][0], instances)
+
+    def invalidate(self, owner: Optional[str] = None) -> None:
+        """Invalidates a single owner, or every owner if none is given."""
+        if owner is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(owner, None)
+
+    def prune(self) -> None:
+        """Drops the expired owners, called on every `set` whether or not a change stream is active."""
+        now = time.monotonic()
+        expired = []
+        for owner, (cached_at, _) in self._entries.items():
+            if now - cached_at < self.ttl:
+                break
+            expired.append(owner)
+        for owner in expired:
+            del self._entries[owner]
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed bucket bounds in seconds."""
+
+    BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-quantile, `inf` past the last bound."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> str:
+        if not self.count:
+            return "no samples"
+        return (
+            f"n={self.count}, avg={self.sum / self.count * 1000:.0f}ms, "
+            f"p50≤{self.quantile(0.5) * 1000:.0f}ms, p99≤{self.quantile(0.99) * 1000:.0f}ms"
+        )
+
+
+class ProbeResult:
+    __slots__ = ("up", "status", "elapsed", "error")
+
+    def __init__(self, up: bool, status: Optional[int], elapsed: float, error: Optional[str] = None):
+        self.up = up
+        self.status = status
+        self.elapsed = elapsed
+        self.error = error
+
+    def describe(self) -> str:
+        if self.up:
+            return f"up, {self.elapsed * 1000:.0f}ms"
+        return f"down, {self.error or f'HTTP {self.status}'}"
+
+
+class HealthChecker:
+    """
+    Probes instances with HEAD requests through a bounded connection pool.
+
+    Results are cached with a TTL and concurrent probes of the same URL share one request.
+    """
+
+    def __init__(self, concurrency: int = 10, timeout: float = 3, ttl: float = 60):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.probe_time = LatencyHistogram()
+        self.hits = 0
+        self._results: Dict[str, Tuple[float, ProbeResult]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Probes wait here rather than in the connector, so the timeout and response time exclude queueing
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created on first use, a session needs the running loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        for task in self._inflight.values():
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+    async def probe(self, url: str) -> ProbeResult:
+        cached = self._results.get(url)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            self.hits += 1
+            return cached[1]
+
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.create_task(self._probe(url))
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def probe_all(self, urls: Iterable[str]) -> Dict[str, ProbeResult]:
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.probe(url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def _probe(self, url: str) -> ProbeResult:
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                async with self.session.head(url, allow_redirects=True) as response:
+                    # 405 still means something is serving the instance
+                    result = ProbeResult(response.status < 400 or response.status == 405, response.status, 0)
+            except asyncio.TimeoutError:
+                result = ProbeResult(False, None, 0, "timed out")
+            except aiohttp.ClientError as e:
+                result = ProbeResult(False, None, 0, type(e).__name__)
+            result.elapsed = time.perf_counter() - start
+        self.probe_time.observe(result.elapsed)
+
+        now = time.monotonic()
+        if len(self._results) >= 1000:
+            self._results = {k: v for k, v in self._results.items() if now - v[0] < self.ttl}
+        self._results[url] = (now, result)
+        return result
+
 
 class LogviewerHosting(commands.Cog):
     """
     Utilities regarding Lorenzo´s Logviewerhosting
     Current Feature(s):
-    - Send info on thread_creation which logviewers are hosted for the user
+    - Send info on thread_creation which logviewers are hosted for the user, and whether they are up
 
     Required .env Variables: `LOGVIEWER_MANAGEMENT_URI` (for thread_creation info)
-    Optional .env Variables: `LOGVIEWERHOST_DOMAIN`
+    Optional .env Variables: `LOGVIEWERHOST_DOMAIN`, `LOGVIEWER_MANAGEMENT_POOL_SIZE`,
+    `LOGVIEWER_MANAGEMENT_TIMEOUT_MS`, `LOGVIEWER_INSTANCE_CACHE_TTL`, `LOGVIEWER_INSTANCE_POLL_INTERVAL`,
+    `LOGVIEWER_LOOKUP_BUDGET`, `LOGVIEWER_LOOKUP_WORKERS`, `LOGVIEWER_PROBE_CONCURRENCY`,
+    `LOGVIEWER_PROBE_TIMEOUT` (0 disables probing), `LOGVIEWER_PROBE_TTL`
     """
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.pool_metrics = PoolMetrics()
+        self.management_db_uri = os.getenv("LOGVIEWER_MANAGEMENT_URI", None)
+        self.management_db_client: Optional["AsyncIOMotorClient"] = None
+        self.instance_cache = InstanceCache(ttl=float(os.getenv("LOGVIEWER_INSTANCE_CACHE_TTL", 300)))
+        self.poll_interval = float(os.getenv("LOGVIEWER_INSTANCE_POLL_INTERVAL", 60))
+        self._watch_task: Optional[asyncio.Task] = None
 
-    @commands.Cog.listener()
-    async def on_thread_ready(self, thread, creator, category, initial_message):
-        logviewer_management_db_uri = os.getenv("LOGVIEWER_MANAGEMENT_URI", None)
-        if logviewer_management_db_uri is None:
+        # Lookups run in the background, so a slow management db never delays thread setup
+        self.lookup_budget = float(os.getenv("LOGVIEWER_LOOKUP_BUDGET", 10))
+        self.lookup_queue: "asyncio.Queue[Tuple[float, object]]" = asyncio.Queue(maxsize=100)
+        self.queue_wait = LatencyHistogram()
+        self.query_time = LatencyHistogram()
+        self.dropped_lookups = 0
+        self._workers: List[asyncio.Task] = []
+        self._post_tasks: Set[asyncio.Task] = set()
+
+        self.log_domain = os.getenv("LOGVIEWERHOST_DOMAIN", "logs.vodka")
+        probe_timeout = float(os.getenv("LOGVIEWER_PROBE_TIMEOUT", 3))
+        self.health: Optional[HealthChecker] = None
+        if probe_timeout > 0:
+            self.health = HealthChecker(
+                concurrency=int(os.getenv("LOGVIEWER_PROBE_CONCURRENCY", 10)),
+                timeout=probe_timeout,
+                ttl=float(os.getenv("LOGVIEWER_PROBE_TTL", 60)),
+            )
+
+    async def cog_load(self):
+        if self.management_db_uri is None:
             LOGGER.warning(
                 "Thread creation logviewer info cannot be sent. "
                 "LOGVIEWER_MANAGEMENT_URI .env variable missing."
             )
-            return
 
+    def get_client(self) -> Optional["AsyncIOMotorClient"]:
+        """
+        Returns the management db client, created on first use together with its background tasks.
+        Motor is only imported at that point, loading the plugin stays cheap.
+        """
+        if self.management_db_client is not None or self.management_db_uri is None:
+            return self.management_db_client
+
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        timeout_ms = int(os.getenv("LOGVIEWER_MANAGEMENT_TIMEOUT_MS", 5000))
+        pool_metrics = pool_listener_type()()
         try:
-            management_db_client: AsyncIOMotorClient = AsyncIOMotorClient(
-                logviewer_management_db_uri, serverSelectionTimeoutMS=5000
+            # One pooled client for the lifetime of the cog, it reconnects on its own
+            self.management_db_client = AsyncIOMotorClient(
+                self.management_db_uri,
+                maxPoolSize=int(os.getenv("LOGVIEWER_MANAGEMENT_POOL_SIZE", 10)),
+                minPoolSize=0,
+                serverSelectionTimeoutMS=timeout_ms,
+                connectTimeoutMS=timeout_ms,
+                socketTimeoutMS=timeout_ms,
+                retryReads=True,
+                event_listeners=[pool_metrics],
             )
-
         except Exception as e:
             LOGGER.warning(f"Failed to connection to logviewer management db.\n{e}", exc_info=True)
+            # Don't retry a broken URI on every thread
+            self.management_db_uri = None
+            return None
+        self.pool_metrics = pool_metrics
+        self._watch_task = self.bot.loop.create_task(self.watch_instances())
+        self.bot.loop.create_task(self.check_indexes())
+        self._workers = [
+            self.bot.loop.create_task(self.lookup_worker())
+            for _ in range(int(os.getenv("LOGVIEWER_LOOKUP_WORKERS", 2)))
+        ]
+        return self.management_db_client
+
+    async def cog_unload(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+        for task in self._post_tasks:
+            task.cancel()
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        if self.management_db_client is not None:
+            self.management_db_client.close()
+            self.management_db_client = None
+        if self.health is not None:
+            await self.health.close()
+
+    @property
+    def instances_collection(self):
+        return self.get_client().get_database("logviewer_management").get_collection("instances")
+
+    async def find_active_instances(self, owner_id: int) -> list:
+        owner = str(owner_id)
+        cached = self.instance_cache.get(owner)
+        if cached is not None:
+            return cached
+
+        from pymongo.errors import AutoReconnect, ServerSelectionTimeoutError
+
+        # Retry once, an AutoReconnect means the pool dropped a stale connection
+        for attempt in range(2):
+            try:
+                instances = []
+                cursor = self.instances_collection.find({"owner": owner, "active": True}, INSTANCE_PROJECTION)
+                async for instance in cursor.batch_size(INSTANCE_BATCH_SIZE):
+                    instances.append(instance)
+            except AutoReconnect as e:
+                if attempt or isinstance(e, ServerSelectionTimeoutError):
+                    raise
+                LOGGER.debug("Lost connection to the logviewer management db, reconnecting.")
+            else:
+                self.instance_cache.set(owner, instances)
+                return instances
+
+    async def check_indexes(self) -> None:
+        """Warns if the `(owner, active)` index the thread lookups rely on is missing."""
+        from pymongo.errors import PyMongoError
+
+        try:
+            indexes = await self.instances_collection.index_information()
+        except PyMongoError as e:
+            LOGGER.warning(f"Failed to check the logviewer instances indexes.\n{e}")
             return
-        database = management_db_client.get_database("logviewer_management")
-        if database is None:
-            LOGGER.warning(f"Logviewer management db cannot be found.")
+        if not any([field for field, _ in index["key"]][:2] == ["owner", "active"] for index in indexes.values()):
+            LOGGER.warning(
+                "The logviewer instances collection has no (owner, active) index, "
+                "thread lookups will scan the whole collection."
+            )
+
+    async def watch_instances(self) -> None:
+        """
+        Keeps the instance cache up to date.
+
+        Changes are followed through a change stream, which needs a replica set.
+        A standalone mongod falls back to periodically refreshing the cached owners.
+        """
+        from pymongo.errors import OperationFailure, PyMongoError
+
+        while True:
+            try:
+                async with self.instances_collection.watch(full_document="updateLookup") as stream:
+                    LOGGER.debug("Watching the logviewer instances collection for changes.")
+                    async for change in stream:
+                        owner = (change.get("fullDocument") or {}).get("owner")
+                        # Deletions don't carry the document anymore, so the owner is unknown
+                        self.instance_cache.invalidate(owner)
+            except OperationFailure as e:
+                LOGGER.info(f"Change streams unavailable ({e}), polling logviewer instances instead.")
+                break
+            except PyMongoError as e:
+                LOGGER.warning(f"Lost the logviewer instances change stream.\n{e}")
+                self.instance_cache.invalidate()
+                await asyncio.sleep(self.poll_interval)
+
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh_cached_owners()
+            except PyMongoError as e:
+                LOGGER.warning(f"Failed to refresh cached logviewer instances.\n{e}")
+
+    async def refresh_cached_owners(self) -> None:
+        """Refreshes every cached owner with a single query, expired owners are dropped."""
+        self.instance_cache.prune()
+        owners = self.instance_cache.owners
+        if not owners:
+            return
+
+        instances: Dict[str, list] = {owner: [] for owner in owners}
+        async for instance in self.instances_collection.find(
+            {"owner": {"$in": owners}, "active": True}, INSTANCE_PROJECTION
+        ).batch_size(INSTANCE_BATCH_SIZE):
+            instances[instance["owner"]].append(instance)
+        for owner, owner_instances in instances.items():
+            self.instance_cache.update(owner, owner_instances)
+
+    @commands.Cog.listener()
+    async def on_thread_ready(self, thread, creator, category, initial_message):
+        if self.get_client() is None:
+            return
+
+        try:
+            self.lookup_queue.put_nowait((time.monotonic(), thread))
+        except asyncio.QueueFull:
+            self.dropped_lookups += 1
+            LOGGER.warning("Logviewer lookup queue is full, skipped thread %s.", thread.channel.id)
+
+    async def lookup_worker(self) -> None:
+        while True:
+            enqueued_at, thread = await self.lookup_queue.get()
+            try:
+                await self.send_hosted_instances(thread, enqueued_at)
+            except Exception:
+                LOGGER.error("Failed to send the hosted logviewers of thread %s.", thread.channel.id, exc_info=True)
+            finally:
+                self.lookup_queue.task_done()
+
+    async def send_hosted_instances(self, thread, enqueued_at: float) -> None:
+        from pymongo.errors import ConnectionFailure
+
+        started_at = time.monotonic()
+        self.queue_wait.observe(started_at - enqueued_at)
+        remaining = self.lookup_budget - (started_at - enqueued_at)
+        if remaining <= 0:
+            self.dropped_lookups += 1
+            LOGGER.info("Logviewer lookup for thread %s exceeded its budget in the queue.", thread.channel.id)
+            return
+
+        try:
+            all_users_active_instances = await asyncio.wait_for(
+                self.find_active_instances(thread.recipient.id), remaining
+            )
+        except asyncio.TimeoutError:
+            self.dropped_lookups += 1
+            LOGGER.info("Logviewer lookup for thread %s exceeded its budget.", thread.channel.id)
             return
-        instances_collection = database.get_collection("instances")
-        if instances_collection is None:
-            LOGGER.warning(f"No instances collection found.")
+        except ConnectionFailure as e:
+            LOGGER.warning(f"Failed to connection to logviewer management db.\n{e}")
+            return
+        finally:
+            self.query_time.observe(time.monotonic() - started_at)
+
+        if not all_users_active_instances:
             return
+        if self.health is None:
+            await self.post_instances(thread, all_users_active_instances)
+        else:
+            # Probing can take up to its timeout, it must not hold up the lookup workers
+            task = self.bot.loop.create_task(self.post_instances(thread, all_users_active_instances))
+            self._post_tasks.add(task)
+            task.add_done_callback(self._post_tasks.discard)
+
+    async def post_instances(self, thread, instances: list) -> None:
+        statuses = None
+        if self.health is not None:
+            statuses = await self.health.probe_all(self.instance_url(instance) for instance in instances)
+        embeds = self.build_instance_embeds(instances, statuses)
+        try:
+            for group in group_embeds(embeds):
+                await thread.channel.send(embeds=group)
+        except discord.HTTPException as e:
+            LOGGER.warning("Failed to send the hosted logviewers of thread %s: %s", thread.channel.id, e)
+
+    def instance_url(self, instance: dict) -> str:
+        return f"https://{instance['name']}.{self.log_domain}/"
 
-        all_users_active_instances = await instances_collection.find(
-            {"owner": str(thread.recipient.id), "active": True},
-            {"mongo_uri": 0},  # Mongo_uri should not be requested and stored in memory
-        ).to_list()
-        if all_users_active_instances:
-            management_db_client.close()
-            log_domain = os.getenv("LOGVIEWERHOST_DOMAIN", "logs.vodka")
-            user_subdomains = []
-            for instance in all_users_active_instances:
-                created_at = format_dt(instance["created_at"], "R")
-                user_subdomains.append(f"- https://{instance['name']}.{log_domain}/ (created {created_at})")
+    def build_instance_embeds(
+        self, instances: list, statuses: Optional[Dict[str, ProbeResult]] = None
+    ) -> List[discord.Embed]:
+        """Splits the instance list into embeds within Discord's description limit."""
+        header = f"This user has currently hosted the following logviewers ({len(instances)}):\n"
 
-            fmt = "\n".join(user_subdomains)
+        pages = []
+        lines = []
+        length = len(header)
+        for instance in instances:
+            created_at = format_dt(instance["created_at"], "R")
+            url = self.instance_url(instance)
+            status = statuses.get(url) if statuses else None
+            if status is None:
+                line = f"- {url} (created {created_at})"
+            else:
+                line = f"- {'🟢' if status.up else '🔴'} {url} (created {created_at}, {status.describe()})"
+            if lines and length + len(line) + 1 > 4096:
+                pages.append(lines)
+                lines = []
+                length = 0
+            lines.append(line)
+            length += len(line) + 1
+        pages.append(lines)
 
+        embeds = []
+        for i, page in enumerate(pages):
             embed = discord.Embed(
-                title="📝 Hosted logviewers by @ Lorenzo",
-                description=f"This user has currently hosted the following logviewers ({len(all_users_active_instances)}):\n"
-                f"{fmt}",
+                title="📝 Hosted logviewers by @ Lorenzo" if i == 0 else None,
+                description=(header if i == 0 else "") + "\n".join(page),
                 color=self.bot.main_color,
             )
-            await thread.channel.send(embed=embed)
+            if len(pages) > 1:
+                embed.set_footer(text=f"Page {i + 1}/{len(pages)}")
+            embeds.append(embed)
+        return embeds
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.MODERATOR)
+    async def logviewerowners(self, ctx, limit: int = 100):
+        """
+        Shows the owners with the most active hosted logviewers.
+        """
+        if self.get_client() is None:
+            return await ctx.send("The logviewer management db is not configured.")
+
+        from pymongo.errors import PyMongoError
+
+        pipeline = [
+            {"$match": {"active": True}},
+            {"$group": {"_id": "$owner", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": limit},
+        ]
+        try:
+            owners = await self.instances_collection.aggregate(pipeline).to_list(None)
+        except PyMongoError as e:
+            return await ctx.send(f"Failed to query the logviewer management db: {e}")
+        if not owners:
+            return await ctx.send("There are no active hosted logviewers.")
+
+        embeds = []
+        for i in range(0, len(owners), 20):
+            lines = [f"<@{owner['_id']}> ({owner['_id']}): {owner['count']}" for owner in owners[i : i + 20]]
+            embeds.append(
+                discord.Embed(
+                    title="Active logviewers per owner",
+                    description="\n".join(lines),
+                    color=self.bot.main_color,
+                )
+            )
+        session = EmbedPaginatorSession(ctx, *embeds)
+        await session.run()
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.SUPPORTER)
+    async def logviewerstats(self, ctx):
+        """
+        Shows the connection pool statistics of the logviewer management db.
+        """
+        metrics = self.pool_metrics
+        embed = discord.Embed(title="Logviewer Management DB", color=self.bot.main_color)
+        embed.add_field(name="Checkouts", value=metrics.checkouts, inline=True)
+        embed.add_field(name="Checkout Failures", value=metrics.checkout_failures, inline=True)
+        embed.add_field(name="In Use", value=metrics.in_use, inline=True)
+        embed.add_field(name="Connections Created", value=metrics.created, inline=True)
+        embed.add_field(name="Connections Closed", value=metrics.closed, inline=True)
+        embed.add_field(name="Pool Clears", value=metrics.pool_clears, inline=True)
+        embed.add_field(name="Cached Owners", value=len(self.instance_cache), inline=True)
+        embed.add_field(name="Cache Hits", value=self.instance_cache.hits, inline=True)
+        embed.add_field(name="Cache Misses", value=self.instance_cache.misses, inline=True)
+        embed.add_field(name="Queued Lookups", value=self.lookup_queue.qsize(), inline=True)
+        embed.add_field(name="Dropped Lookups", value=self.dropped_lookups, inline=True)
+        embed.add_field(name="Queue Wait", value=self.queue_wait.summary(), inline=False)
+        embed.add_field(name="Query Time", value=self.query_time.summary(), inline=False)
+        if self.health is not None:
+            embed.add_field(name="Probe Time", value=self.health.probe_time.summary(), inline=False)
+        await ctx.send(embed=embed)
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,381 @@
+"""
+Latency and error metrics for the commands, listeners and outbound calls of the server plugins,
+exported in the Prometheus text format.
+
+Optional .env Variables:
+- `PLUGIN_METRICS_PORT`: serve the metrics on `http://127.0.0.1:<port>/metrics`
+- `PLUGIN_METRICS_PATH`: write the metrics to this file every `PLUGIN_METRICS_INTERVAL` seconds (default 15)
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+import aiohttp
+import discord
+from discord.ext import commands
+from pymongo import monitoring
+
+from core import checks
+from core.models import PermissionLevel, getLogger
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = getLogger(__name__)
+
+# Module prefix shared by the plugins of this repository, empty when loaded on its own
+PLUGIN_PREFIX = __name__.rsplit(".", 2)[0] + "." if __name__.count(".") >= 2 else ""
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds in seconds."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, int]] = {}
+        self.help: Dict[str, str] = {}
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = tuple(labels.items())
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name: str, **labels: str) -> None:
+        series = self.counters.setdefault(name, {})
+        key = tuple(labels.items())
+        series[key] = series.get(key, 0) + 1
+
+    @staticmethod
+    def _labels(labels: Labels, extra: str = "") -> str:
+        parts = ['{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        out = io.StringIO()
+        for name, series in self.histograms.items():
+            out.write(f"# HELP {name} {self.help.get(name, name)}\n# TYPE {name} histogram\n")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(Histogram.BOUNDS, histogram.counts):
+                    cumulative += count
+                    le = self._labels(labels, 'le="%s"' % bound)
+                    out.write(f"{name}_bucket{le} {cumulative}\n")
+                le = self._labels(labels, 'le="+Inf"')
+                out.write(f"{name}_bucket{le} {histogram.count}\n")
+                out.write(f"{name}_sum{self._labels(labels)} {histogram.sum}\n")
+                out.write(f"{name}_count{self._labels(labels)} {histogram.count}\n")
+        for name, series in self.counters.items():
+            out.write(f"# HELP {name} {self.help.get(name, name)}\n# TYPE {name} counter\n")
+            for labels, value in series.items():
+                out.write(f"{name}{self._labels(labels)} {value}\n")
+        return out.getvalue()
+
+
+class TimedListener:
+    """
+    Wraps a listener to time it.
+
+    Compares equal to the wrapped listener, so `bot.remove_listener` still removes it.
+    """
+
+    __slots__ = ("func", "event", "name", "registry", "__name__")
+
+    def __init__(self, func, event: str, registry: MetricsRegistry):
+        self.func = func
+        self.event = event
+        self.name = getattr(func, "__qualname__", repr(func))
+        self.registry = registry
+        self.__name__ = getattr(func, "__name__", event)
+
+    async def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await self.func(*args, **kwargs)
+        except Exception:
+            self.registry.inc("modmail_plugin_listener_errors_total", listener=self.name, event=self.event)
+            raise
+        finally:
+            self.registry.observe(
+                "modmail_plugin_listener_duration_seconds",
+                time.perf_counter() - start,
+                listener=self.name,
+                event=self.event,
+            )
+
+    def __eq__(self, other):
+        if isinstance(other, TimedListener):
+            return self.func == other.func
+        return self.func == other
+
+    def __hash__(self):
+        return hash(self.func)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Hands the Mongo commands to `sink` on the event loop, Motor runs pymongo and its listeners
+    on executor threads. `sink` gets the command name and duration, `None` for a failed command.
+    """
+
+    def __init__(self):
+        self.sink: Optional[Callable[[str, Optional[float]], None]] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _forward(self, command_name: str, duration: Optional[float]) -> None:
+        sink, loop = self.sink, self.loop
+        if sink is None or loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(sink, command_name, duration)
+        except RuntimeError:
+            # The loop is closed
+            pass
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._forward(event.command_name, event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        self._forward(event.command_name, None)
+
+
+def mongo_command_metrics() -> MongoCommandMetrics:
+    """
+    The Mongo listener of this process. Registered listeners can't be removed, so it is only
+    registered on the first load and found again after the plugin is reloaded.
+    """
+    for listener in monitoring._LISTENERS.command_listeners:
+        if type(listener).__name__ == MongoCommandMetrics.__name__:
+            return listener
+    listener = MongoCommandMetrics()
+    monitoring.register(listener)
+    return listener
+
+
+class PluginMetrics(commands.Cog):
+    """Collects and exports latency and error metrics of the server plugins."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.registry = MetricsRegistry()
+        self.registry.describe("modmail_plugin_command_duration_seconds", "Duration of plugin commands.")
+        self.registry.describe("modmail_plugin_command_errors_total", "Failed plugin commands.")
+        self.registry.describe("modmail_plugin_listener_duration_seconds", "Duration of plugin listeners.")
+        self.registry.describe("modmail_plugin_listener_errors_total", "Failed plugin listeners.")
+        self.registry.describe("modmail_plugin_outbound_duration_seconds", "Duration of HTTP, Mongo and Discord calls.")
+        self.registry.describe("modmail_plugin_outbound_errors_total", "Failed HTTP, Mongo and Discord calls.")
+
+        self.interval = float(os.getenv("PLUGIN_METRICS_INTERVAL", 15))
+        self.mongo_metrics = mongo_command_metrics()
+        self.trace_config = self._build_trace_config()
+        self._original_http_request = None
+        self._task: Optional[asyncio.Task] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def cog_load(self):
+        # Only Mongo clients created after the first load report their commands
+        self.mongo_metrics.loop = self.bot.loop
+        self.mongo_metrics.sink = self._observe_mongo
+        # aiohttp has no public way to trace an existing session
+        self.bot.session._trace_configs.append(self.trace_config)
+        self._instrument_discord_http()
+        self.instrument_listeners()
+        self._task = self.bot.loop.create_task(self.export_loop())
+
+        port = os.getenv("PLUGIN_METRICS_PORT")
+        if port:
+            # aiohttp's server side is only imported when the metrics are served
+            from aiohttp import web
+
+            app = web.Application()
+            app.router.add_get("/metrics", self._serve)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, "127.0.0.1", int(port)).start()
+
+    async def cog_unload(self):
+        # Registered Mongo listeners can't be removed, detach it instead
+        self.mongo_metrics.sink = None
+        if self.trace_config in self.bot.session._trace_configs:
+            self.bot.session._trace_configs.remove(self.trace_config)
+        if self._original_http_request is not None:
+            del self.bot.http.request
+            self._original_http_request = None
+        for event, listeners in self.bot.extra_events.items():
+            listeners[:] = [
+                listener.func if isinstance(listener, TimedListener) else listener for listener in listeners
+            ]
+        if self._task is not None:
+            self._task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _observe_mongo(self, command_name: str, duration: Optional[float]) -> None:
+        if duration is None:
+            self.registry.inc("modmail_plugin_outbound_errors_total", kind="mongo", target=command_name)
+        else:
+            self.registry.observe(
+                "modmail_plugin_outbound_duration_seconds", duration, kind="mongo", target=command_name
+            )
+
+    def instrument_listeners(self) -> None:
+        """Wraps the listeners of the server plugins, listeners that are already wrapped are skipped."""
+        for event, listeners in self.bot.extra_events.items():
+            for i, listener in enumerate(listeners):
+                if isinstance(listener, TimedListener):
+                    continue
+                module = getattr(listener, "__module__", None) or ""
+                if module == __name__ or not module.startswith(PLUGIN_PREFIX):
+                    continue
+                listeners[i] = TimedListener(listener, event, self.registry)
+
+    def _is_plugin(self, ctx) -> bool:
+        return ctx.command is not None and (ctx.command.module or "").startswith(PLUGIN_PREFIX)
+
+    @commands.Cog.listener()
+    async def on_command(self, ctx):
+        if self._is_plugin(ctx):
+            ctx.metrics_started_at = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx):
+        self._observe_command(ctx)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx, error):
+        if self._observe_command(ctx):
+            self.registry.inc(
+                "modmail_plugin_command_errors_total",
+                command=ctx.command.qualified_name,
+                error=type(getattr(error, "original", error)).__name__,
+            )
+
+    def _observe_command(self, ctx) -> bool:
+        started_at = getattr(ctx, "metrics_started_at", None)
+        if started_at is None:
+            return False
+        self.registry.observe(
+            "modmail_plugin_command_duration_seconds",
+            time.perf_counter() - started_at,
+            cog=ctx.command.cog_name or "",
+            command=ctx.command.qualified_name,
+        )
+        return True
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        registry = self.registry
+
+        async def on_request_start(session, context, params):
+            context.started_at = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            registry.observe(
+                "modmail_plugin_outbound_duration_seconds",
+                time.perf_counter() - context.started_at,
+                kind="http",
+                target=params.url.host or "",
+            )
+
+        async def on_request_exception(session, context, params):
+            registry.inc("modmail_plugin_outbound_errors_total", kind="http", target=params.url.host or "")
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.freeze()
+        return trace_config
+
+    def _instrument_discord_http(self) -> None:
+        original = self._original_http_request = self.bot.http.request
+        registry = self.registry
+
+        async def request(route, **kwargs):
+            target = f"{route.method} {route.path}"
+            start = time.perf_counter()
+            try:
+                return await original(route, **kwargs)
+            except Exception:
+                registry.inc("modmail_plugin_outbound_errors_total", kind="discord", target=target)
+                raise
+            finally:
+                registry.observe(
+                    "modmail_plugin_outbound_duration_seconds",
+                    time.perf_counter() - start,
+                    kind="discord",
+                    target=target,
+                )
+
+        self.bot.http.request = request
+
+    async def export_loop(self) -> None:
+        path = os.getenv("PLUGIN_METRICS_PATH")
+        while True:
+            await asyncio.sleep(self.interval)
+            # Plugins loaded after this one are picked up here
+            self.instrument_listeners()
+            if path:
+                try:
+                    await asyncio.to_thread(self._write, path, self.registry.render())
+                except OSError as e:
+                    logger.warning("Failed to write the plugin metrics to %s: %s", path, e)
+
+    @staticmethod
+    def _write(path: str, text: str) -> None:
+        # Write and rename, so scrapers never read a partial file
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(f"{path}.tmp", path)
+
+    async def _serve(self, request: web.Request) -> web.Response:
+        from aiohttp import web
+
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    @commands.command()
+    @checks.has_permissions(PermissionLevel.OWNER)
+    async def pluginmetrics(self, ctx):
+        """
+        Sends the plugin metrics in the Prometheus text format.
+        """
+        self.instrument_listeners()
+        text = self.registry.render()
+        await ctx.send(file=discord.File(io.BytesIO(text.encode()), filename="metrics.txt"))
+
+
+async def setup(bot):
+    await bot.add_cog(PluginMetrics(bot))
@@ -1,3 +1,7 @@
+import io
+import json
+from typing import Dict, List, Optional, Tuple
+
 import discord
 from discord.ext import commands
 
@@ -7,23 +11,125 @@ from core.models import PermissionLevel
 
 class EmbedRaw(commands.Cog):
     """Simple Plugin to print embeded text with copyable Markdown. Credit to [matrix2113](https://github.com/matrix2113) on GitHub."""
+
+    # Messages dumped at most per invocation
+    MAX_MESSAGES = 100
+    # Messages read at most by the history walk, the IDs beyond it are fetched one by one
+    MAX_SCANNED = 500
+
     def __init__(self, bot):
         self.bot = bot
 
+    @staticmethod
+    def parse_ids(arguments: Tuple[str, ...]) -> Tuple[List[int], Optional[Tuple[int, int]]]:
+        """Parses message IDs and at most one `first-last` range."""
+        message_ids = []
+        id_range = None
+        for argument in arguments:
+            for part in argument.replace(",", " ").split():
+                if "-" in part:
+                    first, last = part.split("-", 1)
+                    id_range = tuple(sorted((int(first), int(last))))
+                else:
+                    message_ids.append(int(part))
+        return message_ids, id_range
+
+    async def collect_messages(
+        self, channel, message_ids: List[int], id_range: Optional[Tuple[int, int]]
+    ) -> Dict[int, discord.Message]:
+        """
+        Looks the messages up in the message cache first, the missing ones are
+        fetched with a single history walk over the span they cover. The walk reads
+        at most `MAX_SCANNED` messages, a range is cut off there and the IDs past it
+        are fetched one by one.
+        """
+        wanted = set(message_ids)
+        found: Dict[int, discord.Message] = {}
+        for message in self.bot.cached_messages:
+            if message.channel.id != channel.id:
+                continue
+            if message.id in wanted or (id_range and id_range[0] <= message.id <= id_range[1]):
+                found[message.id] = message
+
+        missing = wanted - found.keys()
+        if not missing and id_range is None:
+            return found
+
+        bounds = sorted(missing) + (list(id_range) if id_range else [])
+        if len(bounds) == 1:
+            # A single message doesn't need a history walk
+            try:
+                found[bounds[0]] = await channel.fetch_message(bounds[0])
+            except discord.NotFound:
+                pass
+            return found
+
+        scanned, scanned_until = 0, 0
+        async for message in channel.history(
+            limit=self.MAX_SCANNED,
+            after=discord.Object(min(bounds) - 1),
+            before=discord.Object(max(bounds) + 1),
+            oldest_first=True,
+        ):
+            scanned, scanned_until = scanned + 1, message.id
+            if message.id in missing or (id_range and id_range[0] <= message.id <= id_range[1]):
+                found[message.id] = message
+            if len(found) >= self.MAX_MESSAGES:
+                return found
+        if scanned < self.MAX_SCANNED:
+            # The walk reached the end of the span, anything not found doesn't exist
+            return found
+
+        for message_id in sorted(missing):
+            if len(found) >= self.MAX_MESSAGES:
+                break
+            if message_id <= scanned_until:
+                continue
+            try:
+                found[message_id] = await channel.fetch_message(message_id)
+            except discord.NotFound:
+                pass
+        return found
+
+    @staticmethod
+    def dump(message: discord.Message) -> dict:
+        return {
+            "id": message.id,
+            "content": message.content,
+            "embeds": [embed.to_dict() for embed in message.embeds],
+            "components": [component.to_dict() for component in message.components],
+        }
 
     @commands.command()
     @checks.has_permissions(PermissionLevel.SUPPORTER)
-    async def raw(self, ctx, message_id: int=None):
-        if message_id is None:
+    async def raw(self, ctx, *message_ids: str):
+        """
+        Shows the raw embeds, fields and components of messages in this channel as JSON.
+
+        Give one or more message IDs and/or a range as `first_id-last_id`.
+        """
+        if not message_ids:
             return await ctx.send("Please provide a message ID")
-        
         try:
-            msg = await ctx.fetch_message(message_id)
-        except Exception as e:
-            print(str(e))
-        msgg = msg.embeds[0]
-        await ctx.send(f"```{msgg.description}```")
-        
+            ids, id_range = self.parse_ids(message_ids)
+        except ValueError:
+            return await ctx.send("Message IDs have to be numbers, ranges are written as `first_id-last_id`.")
+        if len(ids) > self.MAX_MESSAGES:
+            return await ctx.send(f"You can dump at most {self.MAX_MESSAGES} messages at once.")
+
+        try:
+            messages = await self.collect_messages(ctx.channel, ids, id_range)
+        except discord.HTTPException as e:
+            return await ctx.send(f"Failed to fetch the messages: {e.text or e.status}")
+        if not messages:
+            return await ctx.send("No messages found.")
+
+        dumps = [self.dump(messages[message_id]) for message_id in sorted(messages)][: self.MAX_MESSAGES]
+        text = json.dumps(dumps[0] if len(dumps) == 1 else dumps, indent=2, ensure_ascii=False)
+        if len(text) + 12 <= 2000 and "```" not in text:
+            return await ctx.send(f"```json\n{text}\n```")
+        await ctx.send(file=discord.File(io.BytesIO(text.encode()), filename="raw.json"))
+
 
 async def setup(bot):
     await bot.add_cog(EmbedRaw(bot))
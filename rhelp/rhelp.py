@@ -1,215 +1,329 @@
-from typing import Union, Optional, Any
-
-import discord
-from discord.ext import commands
-
-from core import checks
-from cogs.utility import PermissionLevel, UnseenFormatter
-
-from bot import ModmailBot
-
-
-class Rhelp(commands.Cog):
-
-    """Plugin to send command or config help dialogs to a thread recipient.
-    
-    Created by Martin B <@618805150756110336>"""
-
-    def __init__(self, bot: ModmailBot):
-        self.bot = bot
-
-    async def get_help_embed(
-        self, command: Union[commands.Command, commands.Group], ctx
-    ) -> Optional[discord.Embed]:
-        """
-        Gets the help embed from the Modmail Help Command.
-
-        """
-        help_command = self.bot.help_command
-
-        help_command.context = ctx
-        help_command.context.bot = self.bot
-        verified_checks_previous = help_command.verify_checks
-        help_command.verify_checks = False
-
-        result = await help_command._get_help_embed(command)
-
-        if not result:
-            return None
-
-        embed, perm_level = result
-
-        if isinstance(command, commands.Group):
-            embed.add_field(name="Permission Level", value=perm_level, inline=False)
-            format_ = ""
-            length = len(command.commands)
-
-            for i, command in enumerate(
-                await help_command.filter_commands(command.commands, sort=True, key=lambda c: c.name)
-            ):
-                if length == i + 1:  # last
-                    branch = "└─"
-                else:
-                    branch = "├─"
-                format_ += f"`{branch} {command.name}` - {command.short_doc}\n"
-
-            embed.add_field(name="Sub Command(s)", value=format_[:1024], inline=False)
-            embed.set_footer(
-                text=f'Type "{ctx.clean_prefix}{help_command.command_attrs["name"]} command" '
-                "for more info on a command."
-            )
-        elif isinstance(command, commands.Command):
-            embed.set_footer(text=f"Permission level: {perm_level}")
-
-        help_command.verify_checks = verified_checks_previous
-        return embed
-
-    async def get_config_embed(self, command) -> Optional[discord.Embed]:
-        splitted_cmd = command.split("config_")[1]
-        config_help = self.bot.config.config_help
-        embed = None
-
-        def fmt(val):
-            return UnseenFormatter().format(val, prefix=self.bot.prefix, bot=self.bot)
-
-        if (
-            not (
-                splitted_cmd in self.bot.config.public_keys or splitted_cmd in self.bot.config.protected_keys
-            )
-            or splitted_cmd not in config_help
-        ):
-            return None
-
-        for i, (current_key, info) in enumerate(config_help.items()):
-            if current_key == splitted_cmd:
-                config_embed = discord.Embed(title=f"{current_key}", color=self.bot.main_color)
-                config_embed.add_field(name="Default:", value=fmt(info["default"]), inline=False)
-                config_embed.add_field(name="Information:", value=fmt(info["description"]), inline=False)
-                if info["examples"]:
-                    example_text = ""
-                    for example in info["examples"]:
-                        example_text += f"- {fmt(example)}\n"
-                    config_embed.add_field(name="Example(s):", value=example_text, inline=False)
-
-                note_text = ""
-                for note in info.get("notes", []):
-                    note_text += f"- {fmt(note)}\n"
-                if note_text:
-                    config_embed.add_field(name="Note(s):", value=note_text, inline=False)
-
-                if info.get("image") is not None:
-                    config_embed.set_image(url=fmt(info["image"]))
-
-                if info.get("thumbnail") is not None:
-                    config_embed.set_thumbnail(url=fmt(info["thumbnail"]))
-
-                embed = config_embed
-                break
-        return embed
-
-    @commands.command(name="rhelp")
-    @checks.thread_only()
-    @checks.has_permissions(PermissionLevel.SUPPORTER)
-    async def rhelp(self, ctx: commands.Context, *, command: str):
-        """
-        ``DE:`` Sendet die Hilfe für einen bestimmten Befehl an den Nutzer im aktuellen Thread.
-        ``EN:`` Sends help for a specific command to the user in the current thread.
-        """
-        command = command.lower()
-        embed = None
-        is_configuration = False
-
-        if not command.startswith("config_"):
-            bot_command = self.bot.get_command(command)
-            if not bot_command or (bot_command and isinstance(bot_command, commands.Cog)):
-                return await ctx.send(f"Bot Command `{command}` not found.")
-
-            help_embed = await self.get_help_embed(bot_command, ctx)
-            if help_embed is None:
-                return await ctx.send(
-                    f"Something went wrong while generating the help embed for the command `{command}`."
-                )
-            help_embed.set_author(name="Command Help")
-            embed = help_embed
-        else:
-            is_configuration = True
-            config_embed = await self.get_config_embed(command)
-            if not config_embed:
-                return await ctx.send(
-                    f"Configuration key `{command.split('config_')[1]}` not found or failed to create the embed."
-                )
-            config_embed.set_author(name="Configuration Option Help")
-            embed = config_embed
-
-        if embed:
-            help_type = "configuration option help" if is_configuration else "command help"
-            target_command = command.split("config_")[1] if is_configuration else command
-
-            try:
-                ctx.message.content = (
-                    f"Please read below, there you will find the {help_type} for `{target_command}`:"
-                )
-                await ctx.thread.reply(ctx.message)
-                await ctx.thread.recipient.send(embed=embed)
-                await ctx.send(
-                    f"{help_type.capitalize()} for `{target_command}` sent to the user.",
-                    delete_after=10,
-                )
-                if ctx.channel.permissions_for(ctx.guild.me).manage_messages:
-                    await ctx.message.delete(delay=15)
-            except Exception:
-                await ctx.send(f"Something failed during sending the {help_type} anonymously to the user.")
-
-    @commands.command(name="arhelp")
-    @checks.thread_only()
-    @checks.has_permissions(PermissionLevel.SUPPORTER)
-    async def arhelp(self, ctx: commands.Context, *, command: str):
-        """
-        ``DE:`` Sendet die Hilfe für einen bestimmten Befehl an den Nutzer im aktuellen Thread.
-        ``EN:`` Sends help for a specific command to the user in the current thread.
-        """
-        command = command.lower()
-        embed = None
-        is_configuration = False
-
-        if not command.startswith("config_"):
-            bot_command = self.bot.get_command(command)
-            if not bot_command or (bot_command and isinstance(bot_command, commands.Cog)):
-                return await ctx.send(f"Bot Command `{command}` not found.")
-            help_embed = await self.get_help_embed(bot_command, ctx)
-            if help_embed is None:
-                return await ctx.send(
-                    f"Something went wrong while generating the help embed for the command `{command}`."
-                )
-            help_embed.set_author(name="Command Help")
-            embed = help_embed
-        else:
-            is_configuration = True
-            config_embed = await self.get_config_embed(command)
-            if not config_embed:
-                return await ctx.send(f"Configuration key `{command.split('config_')[1]}` not found.")
-            config_embed.set_author(name="Configuration Option Help")
-            embed = config_embed
-
-        if embed:
-            help_type = "configuration option help" if is_configuration else "command help"
-            target_command = command.split("config_")[1] if is_configuration else command
-
-            try:
-                ctx.message.content = (
-                    f"Please read below, there you will find the {help_type} for `{target_command}`:"
-                )
-                await ctx.thread.reply(ctx.message, anonymous=True)
-                await ctx.thread.recipient.send(embed=embed)
-                await ctx.send(
-                    f"{help_type.capitalize()} for `{target_command}` sent anonymously to the user.",
-                    delete_after=10,
-                )
-                if ctx.channel.permissions_for(ctx.guild.me).manage_messages:
-                    await ctx.message.delete(delay=15)
-            except Exception:
-                await ctx.send(f"Something failed during sending the {help_type} anonymously to the user.")
-
-
-async def setup(bot: commands.Bot):
-    await bot.add_cog(Rhelp(bot))
+import asyncio
+import copy
+from bisect import bisect_left
+from collections import defaultdict
+from typing import TYPE_CHECKING, Union, Optional, Any, Dict, Hashable, Iterable, List, Set
+
+import discord
+from discord.ext import commands
+
+from core import checks
+from core.models import PermissionLevel, UnseenFormatter
+
+if TYPE_CHECKING:
+    from bot import ModmailBot
+
+
+def group_embeds(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """Groups embeds into messages, Discord allows at most 10 embeds and 6000 characters per message."""
+    groups: List[List[discord.Embed]] = []
+    size = 0
+    for embed in embeds:
+        if not groups or len(groups[-1]) >= 10 or size + len(embed) > 6000:
+            groups.append([])
+            size = 0
+        groups[-1].append(embed)
+        size += len(embed)
+    return groups
+
+
+class TopicIndex:
+    """Trigram and prefix index over command names and config keys for "did you mean" suggestions."""
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics = sorted(set(topics))
+        self._gram_counts: List[int] = []
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for i, topic in enumerate(self.topics):
+            grams = self._trigrams(topic)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings[gram].append(i)
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        padded = f"  {text} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    def suggest(self, query: str, limit: int = 3, threshold: float = 0.3) -> List[str]:
+        """Prefix matches first, then the topics ranked by trigram similarity."""
+        suggestions = []
+        for topic in self.topics[bisect_left(self.topics, query) :]:
+            if len(suggestions) >= limit or not topic.startswith(query):
+                break
+            if topic != query:
+                suggestions.append(topic)
+
+        grams = self._trigrams(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for i in self._postings.get(gram, ()):
+                shared[i] += 1
+
+        ranked = []
+        for i, count in shared.items():
+            similarity = count / (len(grams) + self._gram_counts[i] - count)
+            if similarity >= threshold:
+                ranked.append((-similarity, self.topics[i]))
+        for _, topic in sorted(ranked):
+            if len(suggestions) >= limit:
+                break
+            if topic != query and topic not in suggestions:
+                suggestions.append(topic)
+        return suggestions
+
+
+class Rhelp(commands.Cog):
+
+    """Plugin to send command or config help dialogs to a thread recipient.
+    
+    Created by Martin B <@618805150756110336>"""
+
+    def __init__(self, bot: "ModmailBot"):
+        self.bot = bot
+        self._embed_cache: Dict[str, discord.Embed] = {}
+        self._cache_fingerprint: Optional[Hashable] = None
+        self._topic_index: Optional[TopicIndex] = None
+
+    def _check_cache(self) -> None:
+        """
+        Clears the cached embeds and topic index whenever a cog or plugin is (un)loaded,
+        or the prefix or main color changes.
+        """
+        # Cog identities, a reloaded plugin's cog keeps its name; commands may be added outside cogs
+        fingerprint = (
+            self.bot.prefix,
+            self.bot.main_color,
+            tuple(map(id, self.bot.cogs.values())),
+            len(self.bot.all_commands),
+        )
+        if fingerprint != self._cache_fingerprint:
+            self._embed_cache.clear()
+            self._topic_index = None
+            self._cache_fingerprint = fingerprint
+
+    @property
+    def topic_index(self) -> TopicIndex:
+        self._check_cache()
+        if self._topic_index is None:
+            config = self.bot.config
+            self._topic_index = TopicIndex(
+                [command.qualified_name for command in self.bot.walk_commands()]
+                + [
+                    f"config_{key}"
+                    for key in config.config_help
+                    if key in config.public_keys or key in config.protected_keys
+                ]
+            )
+        return self._topic_index
+
+    def _did_you_mean(self, topic: str) -> str:
+        suggestions = self.topic_index.suggest(topic)
+        if not suggestions:
+            return ""
+        return " Did you mean " + ", ".join(f"`{suggestion}`" for suggestion in suggestions) + "?"
+
+    @staticmethod
+    def _copy_embed(embed: discord.Embed) -> discord.Embed:
+        # `Embed.copy` shares the fields list with the original
+        return discord.Embed.from_dict(copy.deepcopy(embed.to_dict()))
+
+    def _get_cached_embed(self, key: str) -> Optional[discord.Embed]:
+        """Returns a copy of a cached embed."""
+        self._check_cache()
+        embed = self._embed_cache.get(key)
+        return self._copy_embed(embed) if embed is not None else None
+
+    def _cache_embed(self, key: str, embed: discord.Embed) -> discord.Embed:
+        self._embed_cache[key] = embed
+        return self._copy_embed(embed)
+
+    async def get_help_embed(
+        self, command: Union[commands.Command, commands.Group], ctx
+    ) -> Optional[discord.Embed]:
+        """
+        Gets the help embed from the Modmail Help Command.
+
+        """
+        cache_key = f"command:{command.qualified_name}"
+        cached = self._get_cached_embed(cache_key)
+        if cached is not None:
+            return cached
+
+        # Render with a copy, the bot-wide help command may be serving other invocations concurrently
+        help_command = self.bot.help_command.copy()
+        help_command.context = ctx
+        help_command.verify_checks = False
+
+        result = await help_command._get_help_embed(command)
+
+        if not result:
+            return None
+
+        embed, perm_level = result
+
+        if isinstance(command, commands.Group):
+            embed.add_field(name="Permission Level", value=perm_level, inline=False)
+            format_ = ""
+            length = len(command.commands)
+
+            for i, command in enumerate(
+                await help_command.filter_commands(command.commands, sort=True, key=lambda c: c.name)
+            ):
+                if length == i + 1:  # last
+                    branch = "└─"
+                else:
+                    branch = "├─"
+                format_ += f"`{branch} {command.name}` - {command.short_doc}\n"
+
+            embed.add_field(name="Sub Command(s)", value=format_[:1024], inline=False)
+            embed.set_footer(
+                text=f'Type "{self.bot.prefix}{help_command.command_attrs["name"]} command" '
+                "for more info on a command."
+            )
+        elif isinstance(command, commands.Command):
+            embed.set_footer(text=f"Permission level: {perm_level}")
+
+        return self._cache_embed(cache_key, embed)
+
+    async def get_config_embed(self, command) -> Optional[discord.Embed]:
+        splitted_cmd = command.split("config_")[1]
+        config_help = self.bot.config.config_help
+
+        def fmt(val):
+            return UnseenFormatter().format(val, prefix=self.bot.prefix, bot=self.bot)
+
+        if (
+            not (
+                splitted_cmd in self.bot.config.public_keys or splitted_cmd in self.bot.config.protected_keys
+            )
+            or splitted_cmd not in config_help
+        ):
+            return None
+
+        cache_key = f"config:{splitted_cmd}"
+        cached = self._get_cached_embed(cache_key)
+        if cached is not None:
+            return cached
+
+        info = config_help[splitted_cmd]
+        config_embed = discord.Embed(title=f"{splitted_cmd}", color=self.bot.main_color)
+        config_embed.add_field(name="Default:", value=fmt(info["default"]), inline=False)
+        config_embed.add_field(name="Information:", value=fmt(info["description"]), inline=False)
+        if info["examples"]:
+            example_text = ""
+            for example in info["examples"]:
+                example_text += f"- {fmt(example)}\n"
+            config_embed.add_field(name="Example(s):", value=example_text, inline=False)
+
+        note_text = ""
+        for note in info.get("notes", []):
+            note_text += f"- {fmt(note)}\n"
+        if note_text:
+            config_embed.add_field(name="Note(s):", value=note_text, inline=False)
+
+        if info.get("image") is not None:
+            config_embed.set_image(url=fmt(info["image"]))
+
+        if info.get("thumbnail") is not None:
+            config_embed.set_thumbnail(url=fmt(info["thumbnail"]))
+
+        return self._cache_embed(cache_key, config_embed)
+
+    async def send_help(self, ctx: commands.Context, command: str, anonymous: bool = False):
+        """
+        Sends the help for one or more comma separated topics to the thread recipient,
+        the embeds are sent in as few messages as Discord's size limits allow.
+        """
+        topics = list(dict.fromkeys(topic.strip() for topic in command.lower().split(",") if topic.strip()))
+        if len(topics) > 10:
+            return await ctx.send("You can send the help for at most 10 topics at once.")
+
+        embeds = []
+        for topic in topics:
+            if not topic.startswith("config_"):
+                bot_command = self.bot.get_command(topic)
+                if not bot_command:
+                    return await ctx.send(f"Bot Command `{topic}` not found.{self._did_you_mean(topic)}")
+
+                help_embed = await self.get_help_embed(bot_command, ctx)
+                if help_embed is None:
+                    return await ctx.send(
+                        f"Something went wrong while generating the help embed for the command `{topic}`."
+                    )
+                help_embed.set_author(name="Command Help")
+                embeds.append(help_embed)
+            else:
+                config_embed = await self.get_config_embed(topic)
+                if not config_embed:
+                    return await ctx.send(
+                        f"Configuration key `{topic.split('config_')[1]}` not found or failed to create the embed."
+                        f"{self._did_you_mean(topic)}"
+                    )
+                config_embed.set_author(name="Configuration Option Help")
+                embeds.append(config_embed)
+
+        if not embeds:
+            return
+        # Checked before the introduction is sent, so it is never left without the help below it
+        if any(len(embed) > 6000 for embed in embeds):
+            return await ctx.send("The help is too long to be sent in a message.")
+
+        is_configuration = [topic.startswith("config_") for topic in topics]
+        if all(is_configuration):
+            help_type = "configuration option help"
+        elif not any(is_configuration):
+            help_type = "command help"
+        else:
+            help_type = "help"
+        target_command = "`, `".join(
+            topic.split("config_")[1] if topic.startswith("config_") else topic for topic in topics
+        )
+
+        try:
+            ctx.message.content = f"Please read below, there you will find the {help_type} for `{target_command}`:"
+            # The recipient has to receive the introduction before the embeds
+            await ctx.thread.reply(ctx.message, anonymous=anonymous)
+            for group in group_embeds(embeds):
+                await ctx.thread.recipient.send(embeds=group)
+        except Exception:
+            return await ctx.send(f"Something failed during sending the {help_type} anonymously to the user.")
+
+        sent = "sent anonymously to the user" if anonymous else "sent to the user"
+        await asyncio.gather(
+            ctx.send(f"{help_type.capitalize()} for `{target_command}` {sent}.", delete_after=10),
+            self._delete_invocation(ctx),
+        )
+
+    @staticmethod
+    async def _delete_invocation(ctx: commands.Context):
+        if ctx.channel.permissions_for(ctx.guild.me).manage_messages:
+            await ctx.message.delete(delay=15)
+
+    @commands.command(name="rhelp")
+    @checks.thread_only()
+    @checks.has_permissions(PermissionLevel.SUPPORTER)
+    async def rhelp(self, ctx: commands.Context, *, command: str):
+        """
+        ``DE:`` Sendet die Hilfe für einen bestimmten Befehl an den Nutzer im aktuellen Thread.
+        ``EN:`` Sends help for a specific command to the user in the current thread.
+
+        Separate multiple commands or `config_` keys with commas to send them at once.
+        """
+        await self.send_help(ctx, command)
+
+    @commands.command(name="arhelp")
+    @checks.thread_only()
+    @checks.has_permissions(PermissionLevel.SUPPORTER)
+    async def arhelp(self, ctx: commands.Context, *, command: str):
+        """
+        ``DE:`` Sendet die Hilfe für einen bestimmten Befehl an den Nutzer im aktuellen Thread.
+        ``EN:`` Sends help for a specific command to the user in the current thread.
+
+        Separate multiple commands or `config_` keys with commas to send them at once.
+        """
+        await self.send_help(ctx, command, anonymous=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Rhelp(bot))